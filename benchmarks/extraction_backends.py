@@ -0,0 +1,67 @@
+# throughput of concurrent /play extractions with the thread and the process extraction backends
+# jitter of a 20 ms ticking thread stands in for the voice clients sending audio packets
+# run from the repository root: python -m benchmarks.extraction_backends [requests] [workers]
+import sys
+import time
+import asyncio
+import threading
+import statistics
+
+import configs.public_config as public_config
+
+import helpers.extraction_pool as extraction_pool
+
+from bots.music_instance import MusicBotInstance
+from benchmarks.ytdl_pool import pooled_extract
+
+
+# worker_init of the thread backend silences stdout of the whole process
+stdout = sys.stdout
+
+
+def audio_ticks(stop: threading.Event, jitters: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        time.sleep(0.02)
+        jitters.append(time.perf_counter() - started - 0.02)
+
+
+async def play_request(instance: MusicBotInstance, url: str) -> float:
+    started = time.perf_counter()
+    info = await instance.run_in_process(pooled_extract, url)
+    if not info:
+        raise RuntimeError(f"stand-in extraction failed for {url}")
+    return time.perf_counter() - started
+
+
+async def measure(backend: str, requests: int, workers: int) -> None:
+    public_config.music_settings["ExtractionBackend"] = backend
+    public_config.music_settings["ExtractionWorkers"] = workers
+    pool = extraction_pool.ExtractionPool(extraction_pool.create_pool)
+    instance = MusicBotInstance("benchmark", "", pool)
+    # start every worker and load yt-dlp in it before measuring
+    await asyncio.gather(*[play_request(instance, f"bench:warmup{i}") for i in range(workers * 2)])
+
+    stop = threading.Event()
+    jitters = []
+    ticker = threading.Thread(target=audio_ticks, args=(stop, jitters), daemon=True)
+    ticker.start()
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*[play_request(instance, f"bench:track{i}") for i in range(requests)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    ticker.join()
+    pool.shutdown()
+
+    print(f"{backend}: {requests} concurrent requests in {round(elapsed, 2)}s ({round(requests / elapsed, 1)} requests/s), "
+          f"mean latency {round(statistics.mean(latencies) * 1000, 1)} ms, "
+          f"audio tick jitter mean {round(statistics.mean(jitters) * 1000, 2)} ms max {round(max(jitters) * 1000, 2)} ms", file=stdout)
+
+
+async def main(requests: int, workers: int) -> None:
+    for backend in ("thread", "process"):
+        await measure(backend, requests, workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 4))
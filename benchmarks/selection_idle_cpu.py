@@ -0,0 +1,65 @@
+# CPU usage of play_loop while a song selection panel is open
+# run from the repository root: python -m benchmarks.selection_idle_cpu [seconds]
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import configs.public_config as public_config
+
+from bots.music_instance import MusicBotInstance, GuildState, Song
+
+
+def watchdog(finished: threading.Event, seconds: float) -> None:
+    # a spinning play_loop never yields, so the event loop cannot report anything itself
+    if not finished.wait(seconds + 5):
+        print(f"event loop frozen for more than {seconds + 5} seconds, play_loop is spinning")
+        os._exit(1)
+
+
+async def heartbeat(lags: list) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def measure(instance: MusicBotInstance, name: str, songs: list, seconds: float) -> None:
+    state = GuildState(None)
+    instance.states[0] = state
+    for song in songs:
+        state.add_song(song)
+
+    finished = threading.Event()
+    threading.Thread(target=watchdog, args=(finished, seconds), daemon=True).start()
+    lags = []
+    beat = asyncio.create_task(heartbeat(lags))
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    loop_task = asyncio.create_task(instance.play_loop(0))
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - started_cpu
+    wall = time.perf_counter() - started
+    finished.set()
+
+    loop_task.cancel()
+    beat.cancel()
+    await asyncio.gather(loop_task, beat, return_exceptions=True)
+    state.reset()
+    print(f"{name}: cpu {round(cpu / wall * 100, 2)}% over {round(wall, 1)}s, max loop lag {round(max(lags) * 1000, 2)} ms")
+
+
+async def main(seconds: float) -> None:
+    instance = MusicBotInstance("benchmark", "", ThreadPoolExecutor())
+
+    await measure(instance, "selection pending", [Song()], seconds)
+
+    radio = Song(radio_mode=True)
+    radio.track_info.set_result(public_config.radio_url)
+    await measure(instance, "selection pending ahead of radio", [Song(), radio], seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 3))
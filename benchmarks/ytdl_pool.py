@@ -0,0 +1,74 @@
+# latency of a cold YoutubeDL per extraction against the per-thread one from helpers.get_ytdl
+# a local stand-in extractor is used, so only the YoutubeDL setup and processing cost is measured
+# run from the repository root: python -m benchmarks.ytdl_pool [extractions] [threads]
+import sys
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor.common import InfoExtractor
+
+import configs.public_config as public_config
+
+import helpers.helpers as helpers
+
+
+class BenchIE(InfoExtractor):
+    _VALID_URL = r"bench:(?P<id>\w+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {
+            "id": video_id,
+            "title": f"Track {video_id}",
+            "duration": 180,
+            "webpage_url": url,
+            "formats": [
+                {"format_id": "140", "url": f"http://127.0.0.1/{video_id}.m4a?expire=4102444800", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 128},
+                {"format_id": "251", "url": f"http://127.0.0.1/{video_id}.webm?expire=4102444800", "ext": "webm", "acodec": "opus", "vcodec": "none", "abr": 160},
+            ],
+        }
+
+
+def cold_extract(url):
+    with YoutubeDL(public_config.YTDL_OPTIONS) as ytdl:
+        ytdl.add_info_extractor(BenchIE())
+        return helpers.slim_track_info(ytdl.extract_info(url, download=False, ie_key="Bench"))
+
+
+def pooled_extract(url):
+    ytdl = helpers.get_ytdl()
+    if "Bench" not in ytdl._ies:
+        ytdl.add_info_extractor(BenchIE())
+    return helpers.slim_track_info(ytdl.extract_info(url, download=False, ie_key="Bench"))
+
+
+def timed(func, url):
+    started = time.perf_counter()
+    info = func(url)
+    if not info or not info.get("url"):
+        raise RuntimeError(f"stand-in extraction failed for {url}")
+    return time.perf_counter() - started
+
+
+def run(name, func, extractions, threads):
+    urls = [f"bench:track{i}" for i in range(extractions)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = sorted(executor.map(lambda url: timed(func, url), urls))
+    elapsed = time.perf_counter() - started
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name}: mean {round(statistics.mean(latencies) * 1000, 2)} ms, p95 {round(p95 * 1000, 2)} ms, "
+          f"{round(extractions / elapsed, 1)} extractions/s with {threads} threads")
+    return statistics.mean(latencies)
+
+
+def main(extractions, threads):
+    cold = run("cold YoutubeDL", cold_extract, extractions, threads)
+    pooled = run("pooled YoutubeDL", pooled_extract, extractions, threads)
+    print(f"pooled extraction is {round(cold / pooled, 1)}x faster (recycled every {public_config.music_settings['YtdlMaxUses']} uses)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
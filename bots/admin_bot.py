@@ -10,7 +10,12 @@ import configs.public_config as public_config
 
 import helpers.helpers as helpers
 import helpers.database_logger as database_logger
+import helpers.log_partitions as log_partitions
 import helpers.embedder as embedder
+import helpers.connection_manager as connection_manager
+import helpers.music_cache as music_cache
+import helpers.radio as radio
+import helpers.broadcast as broadcast
 
 from helpers.helpers import GuildOption, Rank
 from helpers.view_panels import MessageForm, TopXP
@@ -384,11 +389,14 @@ class AdminBot():
         async def top(inter: disnake.AppCmdInter, type: str = commands.Param(description="Specify the type of server top", choices=["Voice", "Text"])):
             await inter.response.defer()
 
-            guild_top = await helpers.get_guild_top(inter.guild.id, (False, True)[type == "Voice"])
+            xp_type_voice = (False, True)[type == "Voice"]
+            guild_top = await helpers.get_guild_top(inter.guild.id, xp_type_voice)
+            total = await helpers.get_guild_top_count(inter.guild.id, xp_type_voice)
             v_xp, t_xp = await helpers.get_user_xp(inter.guild.id, inter.author.id)
             author_info = [inter.author.id, v_xp, t_xp]
-            top_list = TopXP(guild_top, inter, author_info, self.bot, (False, True)[type == "Voice"])
-            embed = embedder.xp_top(inter.guild, guild_top, 0, author_info, self.bot.get_user, (False, True)[type == "Voice"])
+            author_position = await helpers.get_user_top_position(inter.guild.id, inter.author.id, xp_type_voice)
+            top_list = TopXP(guild_top, total, inter, author_info, author_position, self.bot, xp_type_voice)
+            embed = embedder.xp_top(inter.guild, guild_top, 0, author_info, author_position, self.bot.get_user, xp_type_voice)
             await helpers.try_function(inter.delete_original_response, True)
             await top_list.send(embed=embed)
 
@@ -685,6 +693,15 @@ class AdminBot():
             message = await self.check_music_bots()
             return await inter.send(message)
 
+        @ self.bot.slash_command(dm_permission=False, description="Shows database connection pools usage", guild_ids=[778558780111060992])
+        async def database_usage_info(inter: disnake.AppCmdInter):
+            await inter.response.defer()
+
+            if not helpers.is_supreme_being(inter.author):
+                return await inter.edit_original_response("Unauthorized access, you are not the Supreme Being!")
+
+            return await inter.send(self.check_database())
+
         @ self.bot.slash_command(dm_permission=False, description="Sends DM to provided user", guild_ids=[778558780111060992])
         async def dm_user(inter: disnake.AppCmdInter,
                           user_id: str = commands.Param(description="User's id")):
@@ -819,23 +836,31 @@ class AdminBot():
             await asyncio.sleep(60)
 
     async def scan_channels(self) -> None:
+        members = []
         for guild in self.bot.guilds:
-            ranks = await helpers.get_guild_option(guild.id, GuildOption.RANK_LIST)
-            ranks = helpers.sort_ranks(ranks)
             for channel in guild.voice_channels:
                 if helpers.get_members_leveling_system(channel.members) > 1 and channel != guild.afk_channel:
                     for member in channel.members:
                         if member.bot or member.voice.self_deaf or member.voice.self_mute or member.voice.deaf or member.voice.mute:
                             continue
-                        v_xp, _ = await helpers.get_user_xp(guild.id, member.id)
-                        v_xp += 1
-                        await helpers.set_user_xp(guild.id, member.id, voice_xp=v_xp)
+                        members.append(member)
 
-                        if not ranks:
-                            continue
+        voice_xp = await helpers.add_voice_xp([(member.guild.id, member.id) for member in members])
 
-                        roles_to_remove, roles_to_add = self.get_roles_from_xp(v_xp, ranks, guild)
-                        await helpers.modify_roles(member, roles_to_remove=roles_to_remove, roles_to_add=roles_to_add)
+        guilds_ranks = {}
+        for member in members:
+            guild = member.guild
+            if guild.id not in guilds_ranks:
+                guilds_ranks[guild.id] = helpers.sort_ranks(await helpers.get_guild_option(guild.id, GuildOption.RANK_LIST))
+            ranks = guilds_ranks[guild.id]
+            if not ranks:
+                continue
+
+            v_xp = voice_xp.get((guild.id, member.id))
+            if v_xp is None:
+                continue
+            roles_to_remove, roles_to_add = self.get_roles_from_xp(v_xp, ranks, guild)
+            await helpers.modify_roles(member, roles_to_remove=roles_to_remove, roles_to_add=roles_to_add)
 
 
 # *_______OnVoiceStateUpdate_________________________________________________________________________________________________________________________________________________________________________________________
@@ -909,36 +934,16 @@ class AdminBot():
         return embedder.guild_info(guild, required_bot, invites, vanity_invite)
 
     async def add_admin(self, guild_id: int, user_id: int) -> bool:
-        admin_list = await helpers.get_guild_option(guild_id, GuildOption.ADMIN_LIST)
-        if not user_id in admin_list:
-            admin_list.append(user_id)
-            await helpers.set_guild_option(guild_id, GuildOption.ADMIN_LIST, admin_list)
-            return True
-        return False
+        return await helpers.add_guild_option(guild_id, GuildOption.ADMIN_LIST, user_id)
 
     async def remove_admin(self, guild_id: int, user_id: int) -> bool:
-        admin_list = await helpers.get_guild_option(guild_id, GuildOption.ADMIN_LIST)
-        if user_id in admin_list:
-            admin_list.remove(user_id)
-            await helpers.set_guild_option(guild_id, GuildOption.ADMIN_LIST, admin_list)
-            return True
-        return False
+        return await helpers.remove_guild_option(guild_id, GuildOption.ADMIN_LIST, user_id)
 
     async def add_untouchable(self, guild_id: int, user_id: int) -> bool:
-        untouchables_list = await helpers.get_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST)
-        if not user_id in untouchables_list:
-            untouchables_list.append(user_id)
-            await helpers.set_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST, untouchables_list)
-            return True
-        return False
+        return await helpers.add_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST, user_id)
 
     async def remove_untouchable(self, guild_id: int, user_id: int) -> bool:
-        untouchables_list = await helpers.get_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST)
-        if user_id in untouchables_list:
-            untouchables_list.remove(user_id)
-            await helpers.set_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST, untouchables_list)
-            return True
-        return False
+        return await helpers.remove_guild_option(guild_id, GuildOption.UNTOUCHABLES_LIST, user_id)
 
     def help(self) -> str:
         ans = "All commands can be used only by admins\n"
@@ -997,6 +1002,12 @@ class AdminBot():
 
     async def check_music_bots(self):
         message = "```"
+        message += f"\n{music_cache.track_cache.stats()}"
+        message += f"\n{music_cache.search_cache.stats()}"
+        for poller in radio.pollers.values():
+            message += f"\nradio poller {poller.stats()}"
+        for stream in list(broadcast.broadcasts.values()):
+            message += f"\nradio broadcast {stream.stats()}"
         for bot in self.music_instances:
             message += f"\n\n{bot.name}:"
             ff = True
@@ -1016,8 +1027,21 @@ class AdminBot():
 
                     if queue_duration:
                         ans += " and queue duration: " + queue_duration[20:]
+                    if state.song_queue.unresolved:
+                        ans += f", {state.song_queue.unresolved} queued tracks not loaded yet"
                     message += ans
             if ff:
                 message += f" IDLE"
+            message += f"\ntrack gaps: {bot.gap_stats()}"
+            message += f"\nstream urls: {bot.refresh_stats()}"
+
+        return message + "```"
 
+    def check_database(self) -> str:
+        message = "```"
+        message += f"\n{connection_manager.bot_db.stats()}"
+        message += f"\n{connection_manager.logs_db.stats()}"
+        message += f"\n{database_logger.log_writer.stats()}"
+        message += f"\n{log_partitions.log_archiver.stats()}"
+        message += f"\n{helpers.guild_options.stats()}"
         return message + "```"
@@ -2,6 +2,7 @@ import disnake
 from disnake.ext import commands
 import asyncio
 import sys
+import datetime
 from typing import Dict
 
 import configs.private_config as private_config
@@ -12,6 +13,8 @@ import helpers.database_logger as database_logger
 import helpers.embedder as embedder
 
 from helpers.helpers import GuildOption
+from helpers.log_partitions import LogSearch
+from helpers.view_panels import LogsSearch
 
 
 class Activity():
@@ -326,6 +329,34 @@ class LogBot():
                 await helpers.set_guild_option(inter.guild.id, GuildOption.WELCOME_CHANNEL, None)
                 await inter.edit_original_response('Welcome logs are disabled.')
 
+        @ self.bot.slash_command(name="logs", dm_permission=False)
+        async def logs_group(inter: disnake.AppCmdInter):
+            pass
+
+        @ logs_group.sub_command(description="Allows admins to search server logs")
+        async def search(inter: disnake.AppCmdInter,
+                         text: str = commands.Param(default=None, description='Words to search for in logs'),
+                         tag: str = commands.Param(default=None, description='Type of logs', choices=["VC", "GUILD", "ENTRY", "PLAY", "SKIP", "RADIO", "STOP", "ERROR", "STATUS"]),
+                         user: (disnake.Member | None) = commands.Param(default=None, description='User mentioned in logs, status logs are searched only for a selected user'),
+                         date_from: str = commands.Param(default=None, description='First date to search in YYYY-MM-DD format'),
+                         date_to: str = commands.Param(default=None, description='Last date to search in YYYY-MM-DD format')):
+            await inter.response.defer()
+
+            if not await helpers.is_admin(inter.author):
+                return await inter.send("Unauthorized access, you are not an admin!")
+
+            for date in [date_from, date_to]:
+                if date:
+                    try:
+                        datetime.datetime.strptime(date, '%Y-%m-%d')
+                    except ValueError:
+                        return await inter.send(f"Wrong date {date}, use YYYY-MM-DD format")
+
+            log_search = LogSearch(inter.guild.id, tag, user.id if user else None, str(user) if user else None, date_from, date_to, text)
+            logs_list = LogsSearch(log_search, inter)
+            await helpers.try_function(inter.delete_original_response, True)
+            await logs_list.send()
+
         @ self.bot.slash_command(description="Reviews list of commands")
         async def help(inter: disnake.AppCmdInter):
             await inter.response.defer()
@@ -393,4 +424,5 @@ class LogBot():
         ans += "Type **/set logs status** to set a channel for status logs\n"
         ans += "Type **/set logs welcome** to set a channel for welcome messages\n"
         ans += "Type **/welcome** to create a welcome banner manually\n"
+        ans += "Type **/logs search** to search server logs\n"
         return ans
@@ -3,11 +3,12 @@ from disnake.ext import commands
 import functools
 import random
 import asyncio
-import json
-import re
 import datetime
-from urllib.request import urlopen
-from concurrent.futures import ThreadPoolExecutor
+import time
+import itertools
+from collections import OrderedDict
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
 
 
 import configs.private_config as private_config
@@ -16,6 +17,9 @@ import configs.public_config as public_config
 import helpers.helpers as helpers
 import helpers.database_logger as database_logger
 import helpers.embedder as embedder
+import helpers.music_cache as music_cache
+import helpers.radio as radio
+import helpers.broadcast as broadcast
 
 from helpers.view_panels import SongSelection, QueueList
 
@@ -46,11 +50,158 @@ class Song():
     author = None
     original_message = None
     radio_mode = None
+    url = None
+    preview = None
+    loading = None
 
-    def __init__(self, *, author="Unknown author", radio_mode=False):
+    def __init__(self, *, author="Unknown author", radio_mode=False, url=None, preview=None):
         self.track_info = asyncio.Future()
         self.author = author
         self.radio_mode = radio_mode
+        self.url = url
+        self.preview = preview
+        self.loading = False
+
+    def get_info(self):
+        if self.track_info.done():
+            return self.track_info.result()
+        return self.preview
+
+
+class SongQueue():
+    songs = None
+    resolved = None
+    version = None
+    changed = None
+    duration = None
+    live_tracks = None
+    unresolved = None
+
+    def __init__(self):
+        # songs are their own handles, the ordered dict gives O(1) push/pop at both ends and removal
+        # values are (duration, live) contributions of each song to the running totals
+        self.songs = OrderedDict()
+        self.resolved = set()
+        self.version = 0
+        self.changed = asyncio.Event()
+        self.duration = 0
+        self.live_tracks = 0
+        self.unresolved = 0
+
+    def __len__(self):
+        return len(self.songs)
+
+    def __iter__(self):
+        return iter(self.songs)
+
+    def __contains__(self, song):
+        return song in self.songs
+
+    def touch(self):
+        self.version += 1
+        self.changed.set()
+
+    def weigh(self, song):
+        info = song.get_info()
+        if not info:
+            return (0, 0)
+        if isinstance(info, str) or info.get("live_status") == "is_live" or not info.get("duration"):
+            return (0, 1)
+        return (info["duration"], 0)
+
+    def count(self, song, sign):
+        duration, live = self.songs[song]
+        self.duration += sign * duration
+        self.live_tracks += sign * live
+
+    def track(self, song):
+        if song in self.songs:
+            self.count(song, -1)
+            if song not in self.resolved:
+                self.unresolved -= 1
+        self.songs[song] = self.weigh(song)
+        self.count(song, 1)
+        if song.track_info.done():
+            self.resolved.add(song)
+        else:
+            self.resolved.discard(song)
+            self.unresolved += 1
+            song.track_info.add_done_callback(lambda _: self.mark_resolved(song))
+
+    def mark_resolved(self, song):
+        if song in self.songs and song not in self.resolved:
+            self.count(song, -1)
+            self.songs[song] = self.weigh(song)
+            self.count(song, 1)
+            self.resolved.add(song)
+            self.unresolved -= 1
+            self.touch()
+
+    def push(self, song):
+        self.track(song)
+        self.touch()
+
+    def push_front(self, song):
+        self.track(song)
+        self.songs.move_to_end(song, last=False)
+        self.touch()
+
+    def extend(self, songs):
+        for song in songs:
+            self.track(song)
+        self.touch()
+
+    def extend_front(self, songs):
+        for song in reversed(songs):
+            self.track(song)
+            self.songs.move_to_end(song, last=False)
+        self.touch()
+
+    def remove(self, song):
+        self.count(song, -1)
+        del self.songs[song]
+        if song in self.resolved:
+            self.resolved.discard(song)
+        else:
+            self.unresolved -= 1
+        self.touch()
+
+    def first(self):
+        return next(iter(self.songs), None)
+
+    def last(self):
+        return next(reversed(self.songs), None)
+
+    def head(self, count):
+        return list(itertools.islice(self.songs, count))
+
+    def slice(self, start, count):
+        return list(itertools.islice(self.songs, start, start + count))
+
+    def first_ready(self):
+        if not self.resolved:
+            return None
+        for song in self.songs:
+            if song in self.resolved:
+                return song
+            # playlist songs keep their place in the queue, wait until the head one is loaded
+            if song.url:
+                return None
+        return None
+
+    def shuffle(self):
+        songs = list(self.songs)
+        random.shuffle(songs)
+        self.songs = OrderedDict((song, self.songs[song]) for song in songs)
+        self.touch()
+
+    def clear(self):
+        self.songs.clear()
+        self.resolved.clear()
+        self.duration = 0
+        self.live_tracks = 0
+        self.unresolved = 0
+        self.touch()
 
 
 class GuildState():
@@ -63,6 +214,20 @@ class GuildState():
     voice = None
     cancel_timeout = None
     song_queue = None
+    loading_tasks = None
+    resolve_slots = None
+    refresher = None
+    prewarmer = None
+    prewarmed = None
+    track_end = None
+    track_ended_at = None
+    track_started_at = None
+    paused_at = None
+    paused_total = None
+    resumed = None
+    gaps_count = None
+    gaps_total = None
+    gaps_max = None
     last_radio_message = None
 
     def __init__(self, guild):
@@ -70,7 +235,15 @@ class GuildState():
         self.skip_flag = False
         self.repeat_flag = False
         self.paused = False
-        self.song_queue = []
+        self.song_queue = SongQueue()
+        self.loading_tasks = set()
+        self.paused_total = 0.0
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+        self.resolve_slots = asyncio.Semaphore(public_config.music_settings["PlaylistConcurrency"])
+        self.gaps_count = 0
+        self.gaps_total = 0.0
+        self.gaps_max = 0.0
         self.last_radio_message = []
 
     def reset(self):
@@ -82,6 +255,106 @@ class GuildState():
         self.cancel_timeout = None
         self.song_queue.clear()
         self.last_radio_message.clear()
+        for task in self.loading_tasks:
+            task.cancel()
+        self.loading_tasks.clear()
+        if self.refresher:
+            self.refresher.cancel()
+            self.refresher = None
+        self.cancel_prewarm()
+        self.drop_prewarmed()
+        radio.unsubscribe(public_config.radio_widget, self)
+        self.finish_track(self.track_end)
+        self.track_end = None
+        self.track_ended_at = None
+        self.paused_at = None
+        self.resumed.set()
+
+    def add_song(self, song, front=False):
+        if front:
+            self.song_queue.push_front(song)
+        else:
+            self.song_queue.push(song)
+
+    def add_songs(self, songs, front=False):
+        if front:
+            self.song_queue.extend_front(songs)
+        else:
+            self.song_queue.extend(songs)
+
+    def remove_song(self, song):
+        self.song_queue.remove(song)
+        if self.prewarmed and self.prewarmed[0] is song:
+            self.drop_prewarmed()
+
+    def shuffle(self):
+        self.song_queue.shuffle()
+        self.drop_prewarmed()
+
+    def cancel_prewarm(self):
+        if self.prewarmer:
+            self.prewarmer.cancel()
+            self.prewarmer = None
+
+    def drop_prewarmed(self):
+        if self.prewarmed:
+            self.prewarmed[1].cleanup()
+            self.prewarmed = None
+
+    def take_prewarmed(self, song):
+        source = None
+        if self.prewarmed and self.prewarmed[0] is song:
+            source = self.prewarmed[1]
+            self.prewarmed = None
+        self.drop_prewarmed()
+        return source
+
+    def finish_track(self, track_end, err=None):
+        if track_end and not track_end.done():
+            if track_end is self.track_end:
+                self.track_ended_at = time.perf_counter()
+            track_end.set_result(err)
+
+    def play_source(self, source):
+        loop = asyncio.get_running_loop()
+        track_end = loop.create_future()
+        self.voice.play(source, after=lambda err: loop.call_soon_threadsafe(self.finish_track, track_end, err))
+        self.track_end = track_end
+        self.track_started_at = time.perf_counter()
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.resumed.set()
+        if self.track_ended_at is not None:
+            gap = time.perf_counter() - self.track_ended_at
+            self.gaps_count += 1
+            self.gaps_total += gap
+            self.gaps_max = max(self.gaps_max, gap)
+            self.track_ended_at = None
+
+    def pause_voice(self):
+        self.voice.pause()
+        if self.paused_at is None:
+            self.paused_at = time.perf_counter()
+            self.resumed.clear()
+
+    def resume_voice(self):
+        self.voice.resume()
+        if self.paused_at is not None:
+            self.paused_total += time.perf_counter() - self.paused_at
+            self.paused_at = None
+        self.resumed.set()
+
+    def played_time(self):
+        now = time.perf_counter()
+        paused = self.paused_total
+        if self.paused_at is not None:
+            paused += now - self.paused_at
+        return now - self.track_started_at - paused
+
+    async def wait_for_song(self):
+        # the queue is touched whenever a queued song is resolved, added or removed
+        self.song_queue.changed.clear()
+        await self.song_queue.changed.wait()
 
     async def connected_to(self, vc):
         while True:
@@ -97,10 +370,14 @@ class MusicBotInstance:
     process_pool = None
     token = None
     on_ready_flag = None
+    refreshed_streams = None
+    late_refreshes = None
+    prewarmed_sources = None
+    speculative_slots = None
 
 # *_______ToInherit___________________________________________________________________________________________________________________________________________
 
-    def __init__(self, name: str, token: str, process_pool: ThreadPoolExecutor):
+    def __init__(self, name: str, token: str, process_pool: Executor):
         self.bot = commands.InteractionBot(intents=disnake.Intents.all(
         ), activity=disnake.Activity(name="/play", type=disnake.ActivityType.listening))
         self.name = name
@@ -108,6 +385,10 @@ class MusicBotInstance:
         self.states = {}
         self.process_pool = process_pool
         self.on_ready_flag = False
+        self.refreshed_streams = 0
+        self.late_refreshes = 0
+        self.prewarmed_sources = 0
+        self.speculative_slots = asyncio.Semaphore(public_config.music_settings["SpeculativeConcurrency"])
 
         @self.bot.event
         async def on_ready():
@@ -167,21 +448,45 @@ class MusicBotInstance:
 
 # *_______Helpers________________________________________________________________________________________________________________________________________
 
+    def gap_stats(self):
+        count = sum(state.gaps_count for state in self.states.values())
+        if not count:
+            return "no track transitions yet"
+        total = sum(state.gaps_total for state in self.states.values())
+        longest = max(state.gaps_max for state in self.states.values())
+        return f"{count} track transitions ({self.prewarmed_sources} prewarmed), avg gap {round(total / count * 1000, 1)} ms, max gap {round(longest * 1000, 1)} ms"
+
+    def refresh_stats(self):
+        return f"{self.refreshed_streams} stream urls refreshed ahead, {self.late_refreshes} refreshed right before playing"
+
     async def run_in_process(self, func, *args, **kwargs):
-        return await asyncio.get_running_loop().run_in_executor(self.process_pool, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.process_pool, functools.partial(func, *args, **kwargs))
+        except BrokenProcessPool as err:
+            print(f"Process pool is broken, running {func.__name__} in a thread: {err}")
+            return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def extract_info(self, url):
+        track_info = music_cache.track_cache.get(url)
+        if track_info:
+            return track_info
+        track_info = music_cache.stamp_expire(await self.run_in_process(helpers.ytdl_extract_info, url))
+        if track_info:
+            await music_cache.track_cache.put(url, track_info)
+        return track_info
 
     async def timeout(self, guild_id):
         state = self.states[guild_id]
         tm = public_config.music_settings["PlayTimeout"]
         message = await state.last_inter.text_channel.send(f"I am left alone, I will leave VC in {tm} seconds!")
         if state.voice.is_playing():
-            state.voice.pause()
+            state.pause_voice()
         state.cancel_timeout = asyncio.Future()
         try:
             resume = await asyncio.wait_for(state.cancel_timeout, tm)
             await message.delete()
             if resume and not state.paused:
-                state.voice.resume()
+                state.resume_voice()
         except:
             if len(self.states[guild_id].voice.channel.members) == 1:
                 try:
@@ -207,9 +512,9 @@ class MusicBotInstance:
         if before.channel == after.channel:
             if helpers.get_members_except_deaf_count(state.voice.channel.members) < 1:
                 if state.voice.is_playing():
-                    state.voice.pause()
+                    state.pause_voice()
             elif not state.paused and not state.voice.is_playing():
-                state.voice.resume()
+                state.resume_voice()
 
         if member.id == self.bot.application_id and not after.channel:
             await asyncio.sleep(1)
@@ -243,16 +548,13 @@ class MusicBotInstance:
         state = self.states[inter.guild.id]
         if not song:
             song = Song(author=inter.author, radio_mode=radio)
-            if playnow:
-                state.song_queue.insert(0, song)
-            else:
-                state.song_queue.append(song)
+            state.add_song(song, playnow)
         if not "https://" in query and not radio:
             asyncio.create_task(self.select_song(inter, song, query))
         else:
             asyncio.create_task(self.add_from_url_to_queue(inter, song, query, playnow=playnow))
 
-    async def add_from_url_to_queue(self, inter, song, url, *, respond=True, playnow=False, playlist_future=None):
+    async def add_from_url_to_queue(self, inter, song, url, *, respond=True, playnow=False, playlist_future=None, prefetched=None):
         state = self.states[inter.guild.id]
         if "?list=" in url or "&list=" in url:
             future = (None, asyncio.Future())["playlist" in url]
@@ -266,17 +568,20 @@ class MusicBotInstance:
             return
         else:
             if "playlist" in url:
-                asyncio.create_task(helpers.add_playlist_delayed_task(helpers.try_function, True, playlist_future, state.song_queue.remove, False, song))
+                asyncio.create_task(helpers.add_playlist_delayed_task(helpers.try_function, True, playlist_future, state.remove_song, False, song))
                 if respond:
                     await inter.orig_inter.delete_original_response()
                 return
             if not song.radio_mode:
-                track_info = await self.run_in_process(helpers.ytdl_extract_info, url)
+                if prefetched:
+                    track_info = await prefetched
+                else:
+                    track_info = await self.extract_info(url)
                 if track_info is None:
                     if respond:
                         await helpers.try_function(inter.orig_inter.delete_original_response, True)
                     await inter.text_channel.send("Error processing video, try another one!")
-                    await helpers.try_function(state.song_queue.remove, False, song)
+                    await helpers.try_function(state.remove_song, False, song)
                     if not state.current_song:
                         await helpers.try_function(state.voice.disconnect, True)
                     return
@@ -297,21 +602,29 @@ class MusicBotInstance:
             return song.track_info.result()
 
     async def select_song(self, inter, song, query):
-        songs = await self.run_in_process(helpers.yt_search, query)
+        songs = await music_cache.search_cache.search(query, functools.partial(self.run_in_process, helpers.yt_search))
         select = SongSelection(songs, self.add_from_url_to_queue, inter, song, self)
         await inter.orig_inter.delete_original_response()
         await select.send()
+        for url in select.url_list:
+            select.prefetch_tasks[url] = asyncio.create_task(self.speculative_extract(url, select.started))
+
+    async def speculative_extract(self, url, started):
+        async with self.speculative_slots:
+            started.add(url)
+            return await self.extract_info(url)
 
     async def add_from_playlist(self, inter, url, orig_url, *, playnow=False, playlist_future=None):
         state = self.states[inter.guild.id]
         msg = await inter.text_channel.send("Processing playlist...")
+        started = time.perf_counter()
         tmp_song = Song(author=datetime.datetime.now())
-        state.song_queue.append(tmp_song)
+        state.add_song(tmp_song)
         playlist_info = await self.run_in_process(helpers.ytdl_extract_info, url)
         if playlist_info is None:
             await msg.delete()
             await inter.text_channel.send("Error processing playlist, try another one!")
-            await helpers.try_function(state.song_queue.remove, False, tmp_song)
+            await helpers.try_function(state.remove_song, False, tmp_song)
             if playlist_future:
                 playlist_future.set_result(None)
             return
@@ -320,73 +633,162 @@ class MusicBotInstance:
             await msg.delete()
             return
 
-        videos_amount = playlist_info['playlist_count']
-        if playnow:
-            for entry in playlist_info['entries'][::-1]:
-                if "entries" in entry:
-                    url = entry["entries"][0]['webpage_url']
-                else:
-                    url = entry['webpage_url']
-                if orig_url == url:
-                    continue
-                track_info = await self.run_in_process(helpers.ytdl_extract_info, url)
-                if not state.voice:
-                    await msg.delete()
-                    return
-                if not track_info:
-                    videos_amount -= 1
-                    continue
-                song = Song(author=inter.author)
-                song.track_info.set_result(track_info)
-                state.song_queue.insert(0, song)
-        else:
-            for entry in playlist_info['entries']:
-                if "entries" in entry:
-                    url = entry["entries"][0]['url']
-                else:
-                    url = entry['url']
-                if orig_url == url:
-                    continue
-                track_info = await self.run_in_process(helpers.ytdl_extract_info, url)
-                if not state.voice:
-                    await msg.delete()
-                    return
-                if not track_info:
-                    videos_amount -= 1
-                    continue
-                song = Song(author=inter.author)
-                song.track_info.set_result(track_info)
-                state.song_queue.append(song)
+        songs = []
+        for entry in playlist_info['entries']:
+            if "entries" in entry:
+                entry = entry["entries"][0]
+            url = entry.get("url") or entry.get("webpage_url")
+            if orig_url == url:
+                continue
+            preview = {"title": entry.get("title") or url, "webpage_url": url, "duration": entry.get("duration") or 0}
+            songs.append(Song(author=inter.author, url=url, preview=preview))
+
+        state.add_songs(songs, playnow)
+        self.prefetch(state)
+        elapsed = time.perf_counter() - started
 
         new_msg = "Playlist has been processed!"
-        if videos_amount != playlist_info['playlist_count']:
-            new_msg += f"\nAdded {videos_amount} out of {playlist_info['playlist_count']} tracks"
+        new_msg += f"\nAdded {len(songs)} tracks, they will be loaded right before playing"
+        if songs:
+            new_msg += f"\nProcessed {len(songs)} tracks in {round(elapsed, 1)}s ({round(len(songs) / max(elapsed, 0.001), 1)} tracks/s)"
         await msg.edit(new_msg, delete_after=10)
-        await helpers.try_function(state.song_queue.remove, False, tmp_song)
+        await helpers.try_function(state.remove_song, False, tmp_song)
         if playlist_future:
             playlist_future.set_result(None)
 
+    def prefetch(self, state):
+        for song in state.song_queue.head(public_config.music_settings["PrefetchWindow"]):
+            if song.url and not song.loading and not song.track_info.done():
+                song.loading = True
+                task = asyncio.create_task(self.resolve_song(state, song))
+                state.loading_tasks.add(task)
+                task.add_done_callback(state.loading_tasks.discard)
+
+    async def refresh_track(self, track_info):
+        fresh_info = music_cache.stamp_expire(await self.run_in_process(helpers.ytdl_extract_info, track_info["webpage_url"]))
+        if not fresh_info or not fresh_info.get("url"):
+            return False
+        track_info["url"] = fresh_info["url"]
+        track_info["expire"] = fresh_info["expire"]
+        track_info["lifetime"] = fresh_info["lifetime"]
+        await music_cache.track_cache.put(track_info["webpage_url"], fresh_info)
+        return True
+
+    def refresh_in_background(self, state, track_info):
+        async def refresh():
+            try:
+                if await self.refresh_track(track_info):
+                    self.refreshed_streams += 1
+            except Exception as err:
+                print(f"Caught exception in refresh_in_background: {err}")
+
+        task = asyncio.create_task(refresh())
+        state.loading_tasks.add(task)
+        task.add_done_callback(state.loading_tasks.discard)
+
+    async def refresh_streams(self, guild_id):
+        state = self.states[guild_id]
+        while True:
+            await asyncio.sleep(public_config.music_settings["RefreshInterval"])
+            starts_in = 0
+            for song in state.song_queue.head(public_config.music_settings["RefreshWindow"]):
+                info = song.get_info()
+                if not isinstance(info, dict):
+                    continue
+                if song.track_info.done() and music_cache.needs_refresh(info, starts_in):
+                    try:
+                        if await self.refresh_track(info):
+                            self.refreshed_streams += 1
+                    except Exception as err:
+                        print(f"Caught exception in refresh_streams: {err}")
+                starts_in += info.get("duration") or 0
+
+    async def prewarm_next(self, state, track_end, duration):
+        prewarm = public_config.music_settings["PrewarmSeconds"]
+        # pause and resume times are recorded by the player, sleep until the remaining play time runs out
+        while True:
+            remaining = duration - prewarm - state.played_time()
+            if remaining <= 0:
+                break
+            if state.paused_at is not None:
+                await state.resumed.wait()
+            else:
+                await asyncio.sleep(remaining)
+            if state.track_end is not track_end or track_end.done():
+                return
+        if state.repeat_flag:
+            song = state.current_song
+        elif state.song_queue:
+            song = state.song_queue.first()
+        else:
+            return
+        if song.radio_mode or not song.track_info.done() or not song.track_info.result():
+            return
+        track_info = song.track_info.result()
+        try:
+            if music_cache.needs_refresh(track_info, prewarm) and await self.refresh_track(track_info):
+                self.refreshed_streams += 1
+            source = disnake.FFmpegPCMAudio(source=track_info.get("url", None), **public_config.FFMPEG_OPTIONS)
+        except Exception as err:
+            print(f"Caught exception in prewarm_next: {err}")
+            return
+        state.drop_prewarmed()
+        state.prewarmed = (song, source)
+
+    async def resolve_song(self, state, song):
+        try:
+            # bounds extractions per guild, a shuffle may put a whole new window at the head
+            async with state.resolve_slots:
+                track_info = await self.extract_info(song.url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            print(f"Caught exception in resolve_song: {err}")
+            track_info = None
+        if not track_info:
+            await helpers.try_function(state.remove_song, False, song)
+        if not song.track_info.done():
+            song.track_info.set_result(track_info)
+
     async def play_loop(self, guild_id):
         state = self.states[guild_id]
         try:
             while state.song_queue:
-                pos = -1
-                for i in range(0, len(state.song_queue)):
-                    if state.song_queue[i].track_info.done():
-                        pos = i
-                        break
-                if pos == -1:
-                    await asyncio.sleep(0)  # Do. Not. Ask.
+                # reset() on a channel move cancels the refresher while the loop keeps going
+                if not state.refresher:
+                    state.refresher = asyncio.create_task(self.refresh_streams(guild_id))
+                self.prefetch(state)
+                song = state.song_queue.first_ready()
+                if not song:
+                    # waiting for a selection or an extraction is not a gap between tracks
+                    state.track_ended_at = None
+                    await state.wait_for_song()
                     continue
-                state.current_song = state.song_queue.pop(pos)
+                state.song_queue.remove(song)
+                state.current_song = song
+                self.prefetch(state)
                 current_track = await state.current_song.track_info
                 if not current_track:
                     continue
 
                 if not state.current_song.radio_mode:
-                    link = current_track.get("url", None)
-
-                    state.voice.play(disnake.FFmpegPCMAudio(source=link, **public_config.FFMPEG_OPTIONS))
+                    source = state.take_prewarmed(state.current_song)
+                    if source:
+                        self.prewarmed_sources += 1
+                    else:
+                        if music_cache.needs_refresh(current_track):
+                            if music_cache.expires_in(current_track) > public_config.music_cache_settings["ExpireMargin"]:
+                                # the url still works for connecting now, keep a fresh one for repeats
+                                self.refresh_in_background(state, current_track)
+                            elif await self.refresh_track(current_track):
+                                # a dead url would only make ffmpeg end the song silently
+                                self.late_refreshes += 1
+                        link = current_track.get("url", None)
+                        source = disnake.FFmpegPCMAudio(source=link, **public_config.FFMPEG_OPTIONS)
+
+                    state.play_source(source)
+                    if current_track.get("duration"):
+                        state.prewarmer = asyncio.create_task(self.prewarm_next(state, state.track_end, current_track["duration"]))
 
                     if state.current_song.original_message:
                         await helpers.try_function(state.current_song.original_message.delete, True)
@@ -395,20 +797,26 @@ class MusicBotInstance:
                     await state.last_inter.text_channel.send("", embed=embed)
                     await database_logger.playing(state.guild, current_track)
                 else:
-                    if len(state.song_queue) > 0 and not state.song_queue[0].radio_mode:
-                        state.song_queue.append(state.current_song)
+                    head = state.song_queue.first()
+                    if head and not head.radio_mode:
+                        state.add_song(state.current_song)
+                        # the head may still wait for a selection, sleep instead of cycling the radio song
+                        if state.song_queue.first_ready() is state.current_song:
+                            state.track_ended_at = None
+                            await state.wait_for_song()
                         continue
                     if state.current_song.original_message:
                         try:
                             await state.current_song.original_message.delete()
                         except:
                             pass
-                    state.voice.play(disnake.FFmpegPCMAudio(
-                        source=current_track, **public_config.FFMPEG_OPTIONS))
+                    state.play_source(broadcast.listen(current_track))
                     if (current_track == public_config.radio_url):
-                        asyncio.create_task(self.radio_message(state))
+                        radio.subscribe(public_config.radio_widget, state, functools.partial(self.radio_message, state))
 
                 await self.play_until_interrupt(guild_id)
+                state.cancel_prewarm()
+                radio.unsubscribe(public_config.radio_widget, state)
                 if not state.voice:
                     break
 
@@ -416,8 +824,7 @@ class MusicBotInstance:
                     state.voice.stop()
                     state.skip_flag = False
                 elif state.repeat_flag:
-                    state.song_queue.insert(
-                        0, state.current_song)
+                    state.add_song(state.current_song, True)
             try:
                 await database_logger.finished(self.states[guild_id].guild.voice_client.channel)
             except:
@@ -431,8 +838,14 @@ class MusicBotInstance:
     async def play_until_interrupt(self, guild_id):
         state = self.states[guild_id]
         try:
-            while (state.voice and (state.voice.is_playing() or state.voice.is_paused()) and not state.skip_flag):
-                await asyncio.sleep(1)
+            while state.track_end:
+                track_end = state.track_end
+                if state.skip_flag:
+                    state.voice.stop()
+                await track_end
+                # pause may restart a live source, which replaces the future of the stopped one
+                if state.track_end is track_end:
+                    break
         except Exception as err:
             await self.abort_play(guild_id)
             await database_logger.error(err, state.guild)
@@ -466,10 +879,7 @@ class MusicBotInstance:
                 song = Song(author=inter.author, radio_mode=radio)
             else:
                 song = Song(author=inter.author)
-            if playnow:
-                state.song_queue.insert(0, song)
-            else:
-                state.song_queue.append(song)
+            state.add_song(song, playnow)
 
             ff, _ = await helpers.try_function(state.voice.move_to, True, inter.voice_channel)
             await state.connected_to(inter.voice_channel)
@@ -494,21 +904,23 @@ class MusicBotInstance:
             if state.voice.is_paused():
                 if state.current_song.radio_mode:
                     state.voice.stop()
-                    state.voice.play(disnake.FFmpegPCMAudio(
-                        source=track_info, **public_config.FFMPEG_OPTIONS))
+                    state.play_source(broadcast.listen(track_info))
+                    if track_info == public_config.radio_url:
+                        # catch up on the track changes missed while paused
+                        radio.subscribe(public_config.radio_widget, state, functools.partial(self.radio_message, state))
                 elif helpers.get_duration(track_info) == "Live":
                     link = track_info.get("url", None)
                     state.voice.stop()
-                    state.voice.play(disnake.FFmpegPCMAudio(
+                    state.play_source(disnake.FFmpegPCMAudio(
                         source=link, **public_config.FFMPEG_OPTIONS))
                 else:
-                    state.voice.resume()
+                    state.resume_voice()
             state.paused = False
             await inter.orig_inter.send("Player resumed!")
         else:
             state.paused = True
             if state.voice.is_playing():
-                state.voice.pause()
+                state.pause_voice()
             await inter.orig_inter.send("Player paused!")
 
     async def repeat(self, inter):
@@ -529,6 +941,8 @@ class MusicBotInstance:
         if not state.voice:
             return
         state.skip_flag = True
+        state.cancel_prewarm()
+        state.voice.stop()
         await database_logger.skip(inter)
         await inter.orig_inter.send("Skipped current track!")
 
@@ -554,8 +968,8 @@ class MusicBotInstance:
 
         if len(state.song_queue) > 0:
             title = "(Not yet loaded)"
-            song = state.song_queue[-1]
-            state.song_queue.pop(-1)
+            song = state.song_queue.last()
+            state.remove_song(song)
             if song.track_info.done():
                 title = song.track_info.result()['title']
             await inter.orig_inter.send(f"Removed {title} from queue!")
@@ -569,40 +983,31 @@ class MusicBotInstance:
             return
 
         if len(state.song_queue) > 1:
-            random.shuffle(state.song_queue)
+            state.shuffle()
+            self.prefetch(state)
             await inter.orig_inter.send("Shuffle completed successfully!")
         elif len(state.song_queue) == 1:
             await inter.orig_inter.send("There are no tracks to shuffle!")
         else:
             await inter.orig_inter.send("I am not playing anything!")
 
-    async def radio_message(self, state):
-        url = public_config.radio_widget
-        name = ""
-        while state.current_song and state.current_song.radio_mode:
-            try:
-                response = urlopen(url)
-                data = json.loads(response.read())
-                data["duration"] -= 14
-                data["name"] = re.search(
-                    "151; (.+?)</span>", data['on_air']).group(1)
-                if data["name"] == name or (state.voice and state.voice.is_paused()):
-                    await asyncio.sleep(1)
-                    continue
-                if len(state.song_queue) > 0:
-                    state.song_queue.append(state.current_song)
-                    state.voice.stop()
-                    return
-                name = data["name"]
-                data["source"] = re.search(
-                    "blank'>(.+?)</a>", data['on_air']).group(1)
-                data['channel'] = state.voice.channel
-                if (state.last_radio_message == data):
-                    return
-                state.last_radio_message = data
-                await state.last_inter.text_channel.send("", embed=embedder.radio(data))
-                await database_logger.radio(state.last_inter.guild, data)
-            except:
-                pass
-            finally:
-                await asyncio.sleep(1)
+    async def radio_message(self, state, data):
+        # called by the shared radio poller whenever the track on air changes
+        try:
+            if not state.voice or not state.current_song or not state.current_song.radio_mode:
+                radio.unsubscribe(public_config.radio_widget, state)
+                return
+            if state.voice.is_paused():
+                return
+            if state.last_radio_message and state.last_radio_message["name"] == data["name"]:
+                return
+            if len(state.song_queue) > 0:
+                state.add_song(state.current_song)
+                state.voice.stop()
+                return
+            data['channel'] = state.voice.channel
+            state.last_radio_message = data
+            await state.last_inter.text_channel.send("", embed=embedder.radio(data))
+            await database_logger.radio(state.last_inter.guild, data)
+        except Exception as err:
+            print(f"Caught exception in radio_message: {err}")
@@ -52,6 +52,58 @@ music_settings = {
     "SelectionPanelTimeout": 30,
     "PlayTimeout": 30,
     "SelectionPanelMaxNameLen": 40,
+    "PrefetchWindow": 3,
+    "PlaylistConcurrency": 4,
+    "RefreshInterval": 30,
+    "RefreshWindow": 10,
+    "YtdlMaxUses": 100,
+    "ExtractionBackend": "process",
+    "ExtractionWorkers": 0,
+    "SpeculativeConcurrency": 2,
+    "PrewarmSeconds": 5,
+}
+
+# fields of yt-dlp track info used by bots, everything else is dropped right after extraction
+track_info_keys = ["id", "title", "webpage_url", "url", "duration", "uploader", "live_status"]
+
+# settings for cache of extracted tracks (stream urls are reused until "expire" from their url minus track duration and margin)
+music_cache_settings = {
+    "MaxBytes": 32 * 1024 * 1024,
+    "ExpireMargin": 60,
+    "StreamTTL": 3600,
+    "Persist": True,
+    "MaxPersisted": 20000,
+    "SearchTTL": 3600,
+    "MaxSearches": 1000,
+}
+
+# settings for sqlite connection pools
+database_settings = {
+    "ReadersCount": 4,
+    "Timeout": 1000,
+}
+
+# settings for buffered text xp writes
+xp_buffer_settings = {
+    "FlushInterval": 5,
+    "MaxPending": 500,
+    "KeptBatches": 4,
+}
+
+# settings for batched log writes and monthly log partitions (retention is counted in months before the current one)
+logs_settings = {
+    "QueueSize": 10000,
+    "BatchSize": 500,
+    "FlushInterval": 2,
+    "RetentionMonths": {
+        "common": 6,
+        "status": 2,
+        "bots": 6,
+        "gpt": 12,
+    },
+    "ArchiveFolder": "db/archive",
+    "MaintenanceInterval": 86400,
+    "VacuumPages": 1000,
 }
 
 # settings for temporary channels
@@ -63,6 +115,19 @@ temporary_channels_settings = {
 radio_url = "http://pool.anison.fm:9000/AniSonFM(320)"
 radio_widget = "http://anison.fm/status.php?widget=true"
 
+# settings for the shared radio widget poller, intervals in seconds
+radio_settings = {
+    "PollInterval": 1,
+    "MaxBackoff": 30,
+    "Timeout": 5,
+}
+
+# settings for radio streams shared by all voice clients, a frame is 20 ms of opus audio
+broadcast_settings = {
+    "BufferFrames": 250,
+    "ReadTimeout": 10,
+}
+
 # string values for direct messages errors
 on_message_supreme_being = "Your attention is an honor for me, my master."
 
@@ -0,0 +1,119 @@
+import threading
+from collections import deque
+
+import disnake
+
+import configs.public_config as public_config
+
+
+class Broadcast():
+    url = None
+    source = None
+    frames = None
+    position = None
+    listeners = None
+    condition = None
+    thread = None
+    stopped = None
+    closed = None
+    skipped_frames = None
+
+    def __init__(self, url: str):
+        self.url = url
+        self.frames = deque(maxlen=public_config.broadcast_settings["BufferFrames"])
+        # position is the number of frames read so far, frames[-1] is frame position - 1
+        self.position = 0
+        self.listeners = set()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.closed = False
+        self.skipped_frames = 0
+        self.source = disnake.FFmpegOpusAudio(source=url, **public_config.FFMPEG_OPTIONS)
+        self.thread = threading.Thread(target=self.run, name=f"broadcast {url}", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while not self.stopped:
+            try:
+                frame = self.source.read()
+            except Exception as err:
+                if not self.stopped:
+                    print(f"Caught exception while reading broadcast {self.url}: {err}")
+                break
+            if not frame:
+                break
+            with self.condition:
+                self.frames.append(frame)
+                self.position += 1
+                self.condition.notify_all()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.source.cleanup()
+
+    def read(self, listener) -> bytes:
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.closed or listener.position < self.position, public_config.broadcast_settings["ReadTimeout"]):
+                return b""
+            oldest = self.position - len(self.frames)
+            if listener.position < oldest:
+                # the listener fell out of the buffer, move it to the live edge
+                self.skipped_frames += self.position - 1 - listener.position
+                listener.position = self.position - 1
+            if listener.position >= self.position:
+                return b""
+            frame = self.frames[listener.position - oldest]
+            listener.position += 1
+            return frame
+
+    def leave(self, listener) -> None:
+        with lock:
+            self.listeners.discard(listener)
+            if self.listeners:
+                return
+            if broadcasts.get(self.url) is self:
+                del broadcasts[self.url]
+        self.stopped = True
+        # killing ffmpeg unblocks the reading thread
+        self.source.cleanup()
+
+    def stats(self) -> str:
+        return f"{self.url}: {len(self.listeners)} listeners, {self.position} frames read, {self.skipped_frames} frames skipped by late listeners"
+
+
+class BroadcastSource(disnake.AudioSource):
+    broadcast = None
+    position = None
+
+    def __init__(self, broadcast: Broadcast):
+        self.broadcast = broadcast
+        # late joiners start at the live edge
+        self.position = broadcast.position
+
+    def read(self) -> bytes:
+        if not self.broadcast:
+            return b""
+        return self.broadcast.read(self)
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        if self.broadcast:
+            self.broadcast.leave(self)
+            self.broadcast = None
+
+
+lock = threading.Lock()
+broadcasts = {}
+
+
+def listen(url: str) -> BroadcastSource:
+    with lock:
+        broadcast = broadcasts.get(url)
+        if not broadcast or broadcast.closed:
+            broadcast = Broadcast(url)
+            broadcasts[url] = broadcast
+        source = BroadcastSource(broadcast)
+        broadcast.listeners.add(source)
+    return source
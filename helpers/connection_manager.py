@@ -0,0 +1,96 @@
+import os
+import time
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+
+import configs.public_config as public_config
+
+
+class ConnectionManager():
+    path = None
+    readers_count = None
+    timeout = None
+    writer = None
+    readers = None
+    write_lock = None
+    wait_time = None
+    max_wait_time = None
+    acquisitions = None
+
+    def __init__(self, path: str, readers_count: int = None):
+        self.path = path
+        self.readers_count = readers_count or public_config.database_settings["ReadersCount"]
+        self.timeout = public_config.database_settings["Timeout"]
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.acquisitions = 0
+
+    async def connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, timeout=self.timeout)
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    async def start(self) -> None:
+        if self.writer:
+            return
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.write_lock = asyncio.Lock()
+        self.writer = await self.connect()
+        self.readers = asyncio.Queue(maxsize=self.readers_count)
+        for _ in range(self.readers_count):
+            self.readers.put_nowait(await self.connect())
+
+    async def close(self) -> None:
+        if not self.writer:
+            return
+        async with self.write_lock:
+            await self.writer.commit()
+            await self.writer.close()
+            self.writer = None
+        for _ in range(self.readers_count):
+            db = await self.readers.get()
+            await db.close()
+
+    def record_wait(self, started: float) -> None:
+        waited = time.perf_counter() - started
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        self.acquisitions += 1
+
+    @asynccontextmanager
+    async def read(self):
+        started = time.perf_counter()
+        db = await self.readers.get()
+        self.record_wait(started)
+        try:
+            yield db
+        finally:
+            self.readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def write(self):
+        started = time.perf_counter()
+        async with self.write_lock:
+            self.record_wait(started)
+            try:
+                yield self.writer
+                await self.writer.commit()
+            except:
+                await self.writer.rollback()
+                raise
+
+    def stats(self) -> str:
+        average = (self.wait_time / self.acquisitions) if self.acquisitions else 0
+        ans = f"{self.path}: {self.acquisitions} acquisitions, "
+        ans += f"avg wait {round(average * 1000, 3)} ms, max wait {round(self.max_wait_time * 1000, 3)} ms"
+        return ans
+
+
+bot_db = ConnectionManager('db/bot_database.db')
+logs_db = ConnectionManager('db/logs.db')
+music_cache_db = ConnectionManager('db/music_cache.db', 1)
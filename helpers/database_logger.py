@@ -2,9 +2,12 @@ import disnake
 import datetime
 import os
 import asyncio
-import aiosqlite
+
+import configs.public_config as public_config
 
 import helpers.helpers as helpers
+import helpers.connection_manager as connection_manager
+import helpers.log_partitions as log_partitions
 
 
 async def error(err, guild):
@@ -206,27 +209,86 @@ async def gpt(member, messages):
 # ---------------- HELPING METHODS  ----------------------------------------------------------------
 
 
+class LogWriter():
+    queue = None
+    batch_ready = None
+    lock = None
+    written = None
+    dropped = None
+    failed = None
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=public_config.logs_settings["QueueSize"])
+        self.batch_ready = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, table_name: str, month: str, row: tuple) -> None:
+        try:
+            self.queue.put_nowait((table_name, month, row))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.batch_ready.set()
+            return
+        if self.queue.qsize() >= public_config.logs_settings["BatchSize"]:
+            self.batch_ready.set()
+
+    async def flush(self) -> None:
+        async with self.lock:
+            while not self.queue.empty():
+                self.batch_ready.clear()
+                batch = {}
+                count = 0
+                while not self.queue.empty() and count < public_config.logs_settings["BatchSize"]:
+                    table_name, month, row = self.queue.get_nowait()
+                    batch.setdefault((table_name, month), []).append(row)
+                    count += 1
+                try:
+                    async with connection_manager.logs_db.write() as db:
+                        for (table_name, month), rows in batch.items():
+                            name = await log_partitions.ensure_partition(db, table_name, month)
+                            await db.executemany(f"INSERT INTO {name} VALUES({log_partitions.get_placeholders(table_name)})", rows)
+                    self.written += count
+                except Exception as err:
+                    print(f"Caught exception in log writer flush: {err}")
+                    log_partitions.known_partitions.clear()
+                    self.failed += count
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.batch_ready.wait(), public_config.logs_settings["FlushInterval"])
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def stats(self) -> str:
+        return f"log writer: {self.written} written, {self.queue.qsize()} queued, {self.dropped} dropped, {self.failed} failed"
+
+
+log_writer = LogWriter()
+
+
 async def commit_to_database(table_name: str, guild_id: int = None,
                              tag: str = None, comment: str = None,
                              query: str = None, response: str = None,
                              user_id: int = None):
-    await helpers.ensure_tables_logger()
-    async with aiosqlite.connect('db/logs.db', timeout=1000) as db:
-        cursor = await db.cursor()
-        now = datetime.datetime.now()
-        date = now.strftime('%Y-%m-%d')
-        time = now.strftime("%H:%M:%S")
-
-        match table_name:
-            case "common":
-                await cursor.execute(f"INSERT INTO common VALUES(?, ?, ?, ?, ?)", (guild_id, date, time, tag, comment))
-            case "bots":
-                await cursor.execute(f"INSERT INTO bots VALUES(?, ?, ?, ?)", (date, time, tag, comment))
-            case "gpt":
-                await cursor.execute(f"INSERT INTO gpt VALUES(?, ?, ?, ?, ?)", (date, time, user_id, query, response))
-            case "status":
-                await cursor.execute(f"INSERT INTO status VALUES(?, ?, ?, ?)", (date, time, user_id, comment))
-            case _:
-                raise (f"Incorrect table name '{table_name}' in commit_to_database!")
-
-        await db.commit()
+    now = datetime.datetime.now()
+    date = now.strftime('%Y-%m-%d')
+    time = now.strftime("%H:%M:%S")
+
+    match table_name:
+        case "common":
+            row = (guild_id, date, time, tag, comment)
+        case "bots":
+            row = (date, time, tag, comment)
+        case "gpt":
+            row = (date, time, user_id, query, response)
+        case "status":
+            row = (date, time, user_id, comment)
+        case _:
+            raise (f"Incorrect table name '{table_name}' in commit_to_database!")
+
+    log_writer.put(table_name, log_partitions.get_month(date), row)
@@ -593,14 +593,10 @@ def queue(guild, queue, start_index, curr_song):
     if len(queue) > 0 and not 'artificial' in curr_song:
         ff = True
         cnt = 0
-        for num in (range(10), range(len(queue) - start_index))[start_index + 10 > len(queue)]:
-            try:
-                if not queue[num + start_index].track_info.done():
-                    num -= 1
-                    continue
-            except:
-                break
-            song = queue[num + start_index].track_info.result()
+        for song in queue.slice(start_index, 10):
+            song = song.get_info()
+            if not song:
+                continue
             if (isinstance(song, str)):
                 title = "Radio"
                 url = song
@@ -625,12 +621,12 @@ def queue(guild, queue, start_index, curr_song):
                         author_name=guild.name, author_icon_url=guild.icon.url, footer_text=guild.name, fields=fields)
 
 
-def xp_top(guild, top_users, start_index, author_info, get_user_function, xp_type_voice):
+def xp_top(guild, top_users, start_index, author_info, author_position, get_user_function, xp_type_voice):
     fields = []
     ff = False
-    for num in (range(10), range(len(top_users) - start_index))[start_index + 10 > len(top_users)]:
-        user_info = top_users[num + start_index]
-        if user_info == author_info:
+    for num in range(len(top_users)):
+        user_info = top_users[num]
+        if user_info[0] == author_info[0]:
             ff = True
         user = get_user_function(user_info[0])
         if not user:
@@ -642,7 +638,7 @@ def xp_top(guild, top_users, start_index, author_info, get_user_function, xp_typ
     if ff:
         description = ""
     else:
-        description = f"*{helpers.get_user_num_badge(top_users.index(author_info))}* *{get_user_function(author_info[0]).mention} - {author_info[(2, 1)[xp_type_voice]]}xp*"
+        description = f"*{helpers.get_user_num_badge(author_position)}* *{get_user_function(author_info[0]).mention} - {author_info[(2, 1)[xp_type_voice]]}xp*"
     return create_embed(title=("Type: Text", "Type: Voice")[xp_type_voice], description=description, color_tag="xp",
                         author_name=guild.name, author_icon_url=guild.icon.url, footer_text=guild.name, fields=fields)
 
@@ -666,7 +662,7 @@ def xp_show(member: disnake.Member, user_info: list, curr_rank: disnake.Role, ne
 def admin_list(admin_list, func, guild):
     ans = ""
     num = 0
-    for admin in admin_list:
+    for admin in sorted(admin_list):
         user = func(admin)
         if user:
             num += 1
@@ -686,6 +682,18 @@ def rank_list(ranks, guild):
     return create_embed(description="**Rank list:**", color_tag="xp", fields=fields, footer_text=guild.name, author_name=guild.name, author_icon_url=guild.icon.url)
 
 
+def logs_search(guild, rows, start_index):
+    fields = []
+    for num in range(len(rows)):
+        row = rows[num]
+        comment = row["comment"] or "-"
+        if len(comment) > 400:
+            comment = comment[:397] + "..."
+        fields.append(EmbedField(name=f"**{start_index + num + 1}. {row['date']} {row['time']} | {row['tag']}**", value=comment))
+    description = ("**No logs found**", "**Logs search results:**")[len(rows) > 0]
+    return create_embed(description=description, color_tag="other_action", fields=fields, footer_text=guild.name, author_name=guild.name, author_icon_url=guild.icon.url)
+
+
 def guild_info(guild: disnake.Guild, bot, invites: list[disnake.Invite] | None, vanity_invite: disnake.Invite | None) -> disnake.Embed:
     fields = []
 
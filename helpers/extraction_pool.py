@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import configs.public_config as public_config
+
+
+def worker_init():
+    f = open(os.devnull, 'w')
+    sys.stdout = f
+    sys.stderr = f
+
+
+def create_pool():
+    if public_config.music_settings["ExtractionBackend"] == "process":
+        workers = public_config.music_settings["ExtractionWorkers"] or os.cpu_count() or 1
+        try:
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=worker_init)
+        except Exception as err:
+            print(f"Couldn't create process pool, falling back to threads: {err}")
+    return ThreadPoolExecutor(initializer=worker_init)
+
+
+class ExtractionPool(Executor):
+    factory = None
+    executor = None
+    rebuilds = None
+    lock = None
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.executor = factory()
+        self.rebuilds = 0
+        self.lock = threading.Lock()
+
+    def rebuild(self, broken):
+        with self.lock:
+            # every task of a broken pool fails, only the first one replaces it
+            if self.executor is not broken:
+                return
+            print(f"Extraction pool is broken, replacing it with a new one")
+            self.executor = self.factory()
+            self.rebuilds += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, /, *args, **kwargs):
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self.rebuild(executor)
+            return self.executor.submit(fn, *args, **kwargs)
+
+        def check_broken(done):
+            if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+                self.rebuild(executor)
+
+        future.add_done_callback(check_broken)
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -1,8 +1,9 @@
 import disnake
 import time
 import re
-import aiosqlite
 import asyncio
+import threading
+from collections import deque
 from typing import List
 from datetime import datetime, timezone
 from yt_dlp import YoutubeDL
@@ -13,6 +14,7 @@ from typing import Any
 import configs.private_config as private_config
 import configs.public_config as public_config
 import helpers.embedder as embedder
+import helpers.connection_manager as connection_manager
 
 
 class Rank:
@@ -239,11 +241,43 @@ def parse_key(key) -> str:
     return res
 
 
+ytdl_local = threading.local()
+
+
+def get_ytdl() -> YoutubeDL:
+    if getattr(ytdl_local, "ytdl", None) is None or ytdl_local.uses >= public_config.music_settings["YtdlMaxUses"]:
+        close_ytdl()
+        ytdl_local.ytdl = YoutubeDL(public_config.YTDL_OPTIONS)
+        ytdl_local.uses = 0
+    ytdl_local.uses += 1
+    return ytdl_local.ytdl
+
+
+def close_ytdl() -> None:
+    ytdl = getattr(ytdl_local, "ytdl", None)
+    ytdl_local.ytdl = None
+    if ytdl:
+        try:
+            ytdl.close()
+        except:
+            pass
+
+
+def slim_track_info(info):
+    if not isinstance(info, dict):
+        return info
+    ans = {key: info.get(key) for key in public_config.track_info_keys}
+    if "entries" in info:
+        ans["entries"] = [slim_track_info(entry) for entry in info["entries"] or [] if entry]
+        ans["playlist_count"] = info.get("playlist_count")
+    return ans
+
+
 def ytdl_extract_info(url, download=False):
     try:
-        with YoutubeDL(public_config.YTDL_OPTIONS) as ytdl:
-            return ytdl.extract_info(url, download=download)
+        return slim_track_info(get_ytdl().extract_info(url, download=download))
     except:
+        close_ytdl()
         return None
 
 
@@ -290,12 +324,10 @@ class GuildOption(Enum):
                 return "private_category"
             case GuildOption.PRIVATE_CHANNEL:
                 return "private_channel"
-            case GuildOption.ADMIN_LIST:
-                return "admin_list"
+            case GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST:
+                return "user_id"
             case GuildOption.RANK_LIST | GuildOption.RANK:
                 return "voice_xp, rank_id, remove_flag"
-            case GuildOption.UNTOUCHABLES_LIST:
-                return "untouchables_list"
             case GuildOption.GIVEAWAY_MESSAGE:
                 return "giveaway_message"
             case GuildOption.GIVEAWAY_ROLE:
@@ -305,15 +337,19 @@ class GuildOption(Enum):
 
     def get_table(self) -> (str | None):
         match self:
-            case GuildOption.LOG_CHANNEL | GuildOption.WELCOME_CHANNEL | GuildOption.STATUS_LOG_CHANNEL | GuildOption.PRIVATE_CATEGORY | GuildOption.PRIVATE_CHANNEL | GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST | GuildOption.GIVEAWAY_MESSAGE | GuildOption.GIVEAWAY_ROLE:
+            case GuildOption.LOG_CHANNEL | GuildOption.WELCOME_CHANNEL | GuildOption.STATUS_LOG_CHANNEL | GuildOption.PRIVATE_CATEGORY | GuildOption.PRIVATE_CHANNEL | GuildOption.GIVEAWAY_MESSAGE | GuildOption.GIVEAWAY_ROLE:
                 return "server_options"
+            case GuildOption.ADMIN_LIST:
+                return "guild_admins"
+            case GuildOption.UNTOUCHABLES_LIST:
+                return "guild_untouchables"
             case GuildOption.RANK_LIST | GuildOption.RANK:
                 return "ranks_data"
             case _:
                 return None
 
 
-def convert_to_python(option: GuildOption, value) -> (int | list):
+def convert_to_python(option: GuildOption, value) -> (int | list | frozenset):
     to_int = [GuildOption.LOG_CHANNEL, GuildOption.WELCOME_CHANNEL, GuildOption.STATUS_LOG_CHANNEL, GuildOption.PRIVATE_CATEGORY, GuildOption.PRIVATE_CHANNEL, GuildOption.GIVEAWAY_MESSAGE, GuildOption.GIVEAWAY_ROLE]
     to_int_list = [GuildOption.ADMIN_LIST, GuildOption.UNTOUCHABLES_LIST]
     match option:
@@ -323,10 +359,10 @@ def convert_to_python(option: GuildOption, value) -> (int | list):
             else:
                 return int(value[0])
         case option if option in to_int_list:
-            if not value or not value[0]:
-                return []
+            if not value:
+                return frozenset()
             else:
-                return eval(value[0])
+                return frozenset(int(row["user_id"]) for row in value)
         case GuildOption.RANK_LIST:
             if not value:
                 return []
@@ -339,74 +375,125 @@ def convert_to_python(option: GuildOption, value) -> (int | list):
             raise f"Wrong option {option}"
 
 
-async def ensure_tables() -> None:
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        await db.execute('''CREATE TABLE IF NOT EXISTS users_xp_data (
-                            guild_id INTEGER,
-                            user_id INTEGER,
-                            voice_xp INTEGER,
-                            text_xp INTEGER,
-                            last_activity INTEGER,
-                            UNIQUE(guild_id, user_id)
-                        )''')
-
-        await db.execute('''CREATE TABLE IF NOT EXISTS ranks_data (
-                            guild_id INTEGER,
-                            rank_id INTEGER,
-                            voice_xp INTEGER,
-                            remove_flag INTEGER,
-                            UNIQUE(guild_id, rank_id)
-                        )''')
-
-        await db.execute('''CREATE TABLE IF NOT EXISTS server_options (
-                            guild_id INTEGER PRIMARY KEY,
-                            log_channel INTEGER,
-                            status_log_channel INTEGER,
-                            welcome_channel INTEGER,
-                            private_category INTEGER,
-                            private_channel INTEGER,
-                            admin_list TEXT,
-                            untouchables_list TEXT,
-                            giveaway_message INTEGER,
-                            giveaway_role INTEGER
-                        )''')
-
-        await db.commit()
-
-
-async def ensure_tables_logger() -> None:
-    async with aiosqlite.connect('db/logs.db', timeout=1000) as db:
-        await db.execute('''CREATE TABLE IF NOT EXISTS status (
-                            date TEXT,
-                            time TEXT,
-                            user_id INTEGER,
-                            comment TEXT
-                        )''')
-
-        await db.execute('''CREATE TABLE IF NOT EXISTS gpt (
-                            date TEXT,
-                            time TEXT,
-                            user_id INTEGER,
-                            query TEXT,
-                            response TEXT
-                        )''')
-
-        await db.execute('''CREATE TABLE IF NOT EXISTS bots (
-                            date TEXT,
-                            time TEXT,
-                            tag TEXT,
-                            comment TEXT
-                        )''')
-
-        await db.execute('''CREATE TABLE IF NOT EXISTS common (
-                            guild_id INTEGER,
-                            date TEXT,
-                            time TEXT,
-                            tag TEXT,
-                            comment TEXT
-                        )''')
-
-        await db.commit()
+class GuildOptionsCache():
+    values = None
+    hits = None
+    misses = None
+
+    def __init__(self):
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self) -> None:
+        values = {}
+        ranks = {}
+        async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
+            await cursor.execute("SELECT * FROM server_options")
+            for row in await cursor.fetchall():
+                for option in GuildOption:
+                    if option.get_table() == "server_options":
+                        values[(row["guild_id"], option)] = convert_to_python(option, (row[option.to_str()],))
+            await cursor.execute(f"SELECT guild_id, {GuildOption.RANK_LIST.to_str()} FROM {GuildOption.RANK_LIST.get_table()}")
+            for row in await cursor.fetchall():
+                ranks.setdefault((row["guild_id"], GuildOption.RANK_LIST), []).append(row)
+            for option in [GuildOption.ADMIN_LIST, GuildOption.UNTOUCHABLES_LIST]:
+                await cursor.execute(f"SELECT guild_id, {option.to_str()} FROM {option.get_table()}")
+                for row in await cursor.fetchall():
+                    ranks.setdefault((row["guild_id"], option), []).append(row)
+        for key, rows in ranks.items():
+            values[key] = convert_to_python(key[1], rows)
+        self.values = values
+
+    def get(self, guild_id: int, option: GuildOption):
+        key = (guild_id, option)
+        if key in self.values:
+            self.hits += 1
+            return True, self.values[key]
+        self.misses += 1
+        return False, None
+
+    def set(self, guild_id: int, option: GuildOption, value) -> None:
+        self.values[(guild_id, option)] = value
+
+    def update(self, guild_id: int, option: GuildOption, function) -> None:
+        key = (guild_id, option)
+        if key in self.values:
+            self.values[key] = function(self.values[key])
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        ratio = round(self.hits * 100 / total, 2) if total else 0
+        return f"guild options cache: {len(self.values)} entries, {self.hits} hits, {self.misses} misses ({ratio}% hit ratio)"
+
+
+guild_options = GuildOptionsCache()
+
+
+class TextXpBuffer():
+    pending = None
+    batches = None
+    flush_scheduled = None
+    lock = None
+
+    def __init__(self):
+        self.pending = {}
+        # (batch id, deltas) of the batch being written and the last committed ones
+        self.batches = deque(maxlen=public_config.xp_buffer_settings["KeptBatches"])
+        self.flush_scheduled = False
+        self.lock = asyncio.Lock()
+
+    def add(self, guild_id: int, user_id: int, text_xp: int) -> None:
+        key = (guild_id, user_id)
+        self.pending[key] = self.pending.get(key, 0) + text_xp
+        if len(self.pending) >= public_config.xp_buffer_settings["MaxPending"] and not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.create_task(self.flush())
+
+    def get(self, guild_id: int, user_id: int, last_batch: int) -> int:
+        # last_batch is the id of the newest batch the caller's database read already includes
+        key = (guild_id, user_id)
+        ans = self.pending.get(key, 0)
+        for batch_id, deltas in self.batches:
+            if batch_id > last_batch:
+                ans += deltas.get(key, 0)
+        return ans
+
+    def discard(self, guild_id: int, user_id: int = None) -> None:
+        if user_id is not None:
+            self.pending.pop((guild_id, user_id), None)
+            return
+        for key in [key for key in self.pending if key[0] == guild_id]:
+            del self.pending[key]
+
+    async def flush(self) -> None:
+        self.flush_scheduled = False
+        async with self.lock:
+            if not self.pending:
+                return
+            batch = (time.time_ns(), self.pending)
+            self.pending = {}
+            self.batches.append(batch)
+            last_activity = int(time.time())
+            rows = [(guild_id, user_id, text_xp, last_activity) for (guild_id, user_id), text_xp in batch[1].items()]
+            try:
+                async with connection_manager.bot_db.write() as db:
+                    await db.executemany("""INSERT INTO users_xp_data (guild_id, user_id, voice_xp, text_xp, last_activity) VALUES(?, ?, 0, ?, ?)
+                                            ON CONFLICT(guild_id, user_id) DO UPDATE SET text_xp = text_xp + excluded.text_xp, last_activity = excluded.last_activity""", rows)
+                    await db.execute("UPDATE text_xp_flushes SET last_batch = ?", (batch[0],))
+            except Exception as err:
+                print(f"Caught exception in text xp flush: {err}")
+                self.batches.remove(batch)
+                for key, text_xp in batch[1].items():
+                    self.pending[key] = self.pending.get(key, 0) + text_xp
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(public_config.xp_buffer_settings["FlushInterval"])
+            await self.flush()
+
+
+text_xp_buffer = TextXpBuffer()
 
 
 async def request_guild_option(guild_id: int, option: GuildOption):
@@ -416,16 +503,13 @@ async def request_guild_option(guild_id: int, option: GuildOption):
     opt_table = option.get_table()
     if not opt_str or not opt_table:
         raise f"Wrong option {option}"
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
 
         match option:
-            case GuildOption.LOG_CHANNEL | GuildOption.WELCOME_CHANNEL | GuildOption.STATUS_LOG_CHANNEL | GuildOption.PRIVATE_CATEGORY | GuildOption.PRIVATE_CHANNEL | GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST | GuildOption.GIVEAWAY_MESSAGE | GuildOption.GIVEAWAY_ROLE:
+            case GuildOption.LOG_CHANNEL | GuildOption.WELCOME_CHANNEL | GuildOption.STATUS_LOG_CHANNEL | GuildOption.PRIVATE_CATEGORY | GuildOption.PRIVATE_CHANNEL | GuildOption.GIVEAWAY_MESSAGE | GuildOption.GIVEAWAY_ROLE:
                 await cursor.execute(f"SELECT {opt_str} FROM {option.get_table()} WHERE guild_id = ?", (guild_id,))
                 res = await cursor.fetchone()
-            case GuildOption.RANK_LIST:
+            case GuildOption.RANK_LIST | GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST:
                 await cursor.execute(f"SELECT {opt_str} FROM {option.get_table()} WHERE guild_id = ?", (guild_id,))
                 res = await cursor.fetchall()
             case _:
@@ -434,18 +518,22 @@ async def request_guild_option(guild_id: int, option: GuildOption):
 
 
 async def get_guild_option(guild_id: int, option: GuildOption):
-    ans = await request_guild_option(guild_id, option)
-    return convert_to_python(option, ans)
+    if not guild_id:
+        return convert_to_python(option, None)
+    found, ans = guild_options.get(guild_id, option)
+    if not found:
+        ans = convert_to_python(option, await request_guild_option(guild_id, option))
+        guild_options.set(guild_id, option, ans)
+    if isinstance(ans, list):
+        return list(ans)
+    return ans
 
 
 async def add_guild_option(guild_id: int, option: GuildOption, value):
     if not guild_id:
         return
 
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         match option:
             case GuildOption.RANK:
                 await cursor.execute(f"SELECT {option.to_str()} FROM {option.get_table()} WHERE guild_id = ? AND rank_id = ?", (guild_id, value.role_id,))
@@ -453,19 +541,23 @@ async def add_guild_option(guild_id: int, option: GuildOption, value):
                 res = bool(res)
                 if not res:
                     await cursor.execute(f"INSERT INTO {option.get_table()} (guild_id, {option.to_str()}) VALUES(?, ?, ?, ?)", (guild_id, int(value.voice_xp), value.role_id, int(value.remove_on_promotion)))
+            case GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST:
+                await cursor.execute(f"INSERT OR IGNORE INTO {option.get_table()} (guild_id, {option.to_str()}) VALUES(?, ?)", (guild_id, int(value),))
+                res = cursor.rowcount == 0
             case _:
                 raise f"Wrong option {option}"
-        await db.commit()
+    if not res:
+        if option == GuildOption.RANK:
+            guild_options.update(guild_id, GuildOption.RANK_LIST, lambda ranks: ranks + [Rank(value.role_id, int(value.voice_xp), bool(value.remove_on_promotion))])
+        else:
+            guild_options.update(guild_id, option, lambda members: members | {int(value)})
     return not res
 
 
 async def remove_guild_option(guild_id: int, option: GuildOption, value):
     if not guild_id:
         return
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         match option:
             case GuildOption.RANK:
                 await cursor.execute(f"SELECT {option.to_str()} FROM {option.get_table()} WHERE guild_id = ? AND rank_id = ?", (guild_id, int(value),))
@@ -473,9 +565,16 @@ async def remove_guild_option(guild_id: int, option: GuildOption, value):
                 res = bool(res)
                 if res:
                     await cursor.execute(f"DELETE FROM {option.get_table()} WHERE guild_id = ? AND rank_id = ? ", (guild_id, int(value),))
+            case GuildOption.ADMIN_LIST | GuildOption.UNTOUCHABLES_LIST:
+                await cursor.execute(f"DELETE FROM {option.get_table()} WHERE guild_id = ? AND {option.to_str()} = ?", (guild_id, int(value),))
+                res = cursor.rowcount > 0
             case _:
                 raise f"Wrong option {option}"
-        await db.commit()
+    if res:
+        if option == GuildOption.RANK:
+            guild_options.update(guild_id, GuildOption.RANK_LIST, lambda ranks: [rank for rank in ranks if rank.role_id != int(value)])
+        else:
+            guild_options.update(guild_id, option, lambda members: members - {int(value)})
     return res
 
 
@@ -484,58 +583,66 @@ async def set_guild_option(guild_id: int, option: GuildOption, value):
         return
     opt_str = option.to_str()
     opt_table = option.get_table()
-    if not opt_str or not opt_table:
+    if not opt_str or opt_table != "server_options":
         raise f"Wrong option {option}"
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         await cursor.execute(f"INSERT OR IGNORE INTO {opt_table} (guild_id) VALUES(?)", (guild_id,))
         if value:
-            if option == GuildOption.ADMIN_LIST or option == GuildOption.UNTOUCHABLES_LIST:
-                await cursor.execute(f"UPDATE server_options SET {opt_str} = ? WHERE guild_id = ?", (str(value), guild_id,))
-            else:
-                await cursor.execute(f"UPDATE server_options SET {opt_str} = ? WHERE guild_id = ?", (int(value), guild_id,))
+            await cursor.execute(f"UPDATE server_options SET {opt_str} = ? WHERE guild_id = ?", (int(value), guild_id,))
         else:
             await cursor.execute(f"UPDATE server_options SET {opt_str} = NULL WHERE guild_id = ?", (guild_id,))
-        await db.commit()
+    guild_options.set(guild_id, option, int(value) if value else None)
 
 
 async def get_user_xp(guild_id: int, user_id: int):
     if not guild_id or not user_id:
         return None
 
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
-        await cursor.execute(f"SELECT voice_xp, text_xp FROM users_xp_data WHERE guild_id = ? AND user_id = ?", (guild_id, user_id,))
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
+        # the id of the last committed text xp batch comes from the same snapshot as the row
+        await cursor.execute(f"""SELECT (SELECT last_batch FROM text_xp_flushes) AS last_batch, voice_xp, text_xp
+                                 FROM (SELECT 1) LEFT JOIN users_xp_data ON guild_id = ? AND user_id = ?""", (guild_id, user_id,))
         res = await cursor.fetchone()
-    if res:
-        return res["voice_xp"], res["text_xp"]
+    text_xp = text_xp_buffer.get(guild_id, user_id, res["last_batch"])
+    if res["voice_xp"] is not None:
+        return res["voice_xp"], res["text_xp"] + text_xp
     else:
-        return 0, 0
+        return 0, text_xp
+
+
+def get_xp_column(xp_type_voice: bool) -> str:
+    return ("text_xp", "voice_xp")[xp_type_voice]
 
 
-async def get_guild_top(guild_id: int, xp_type_voice: bool):
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
-        await cursor.execute(f"SELECT user_id, voice_xp, text_xp FROM users_xp_data WHERE guild_id = ?", (guild_id,))
+async def get_guild_top(guild_id: int, xp_type_voice: bool, start_index: int = 0, amount: int = 10) -> list:
+    if not xp_type_voice:
+        await text_xp_buffer.flush()
+    column = get_xp_column(xp_type_voice)
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
+        await cursor.execute(f"""SELECT user_id, voice_xp, text_xp FROM users_xp_data WHERE guild_id = ? AND {column} > 0
+                                 ORDER BY {column} DESC, user_id LIMIT ? OFFSET ?""", (guild_id, amount, start_index))
         users = await cursor.fetchall()
+    return [[int(user["user_id"]), user["voice_xp"], user["text_xp"]] for user in users]
 
-    if not users:
-        return []
 
-    ans = []
-    users = sorted(users, key=lambda user: user[(2, 1)[xp_type_voice]], reverse=True)
+async def get_guild_top_count(guild_id: int, xp_type_voice: bool) -> int:
+    if not xp_type_voice:
+        await text_xp_buffer.flush()
+    column = get_xp_column(xp_type_voice)
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
+        await cursor.execute(f"SELECT COUNT(*) FROM users_xp_data WHERE guild_id = ? AND {column} > 0", (guild_id,))
+        res = await cursor.fetchone()
+    return res[0]
 
-    for user in users:
-        if user[(2, 1)[xp_type_voice]] != 0:
-            ans.append([int(user["user_id"]), user["voice_xp"], user["text_xp"]])
-    del users
-    return ans
+
+async def get_user_top_position(guild_id: int, user_id: int, xp_type_voice: bool) -> int:
+    v_xp, t_xp = await get_user_xp(guild_id, user_id)
+    xp = (t_xp, v_xp)[xp_type_voice]
+    column = get_xp_column(xp_type_voice)
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
+        await cursor.execute(f"SELECT COUNT(*) FROM users_xp_data WHERE guild_id = ? AND ({column} > ? OR ({column} = ? AND user_id < ?))", (guild_id, xp, xp, user_id))
+        res = await cursor.fetchone()
+    return res[0]
 
 
 async def get_next_rank(member: disnake.Member):
@@ -591,56 +698,66 @@ async def set_user_xp(guild_id: int, user_id: int, voice_xp: int | None = None,
     if not guild_id or not user_id or (voice_xp is None and text_xp is None):
         return None
 
+    if text_xp is not None:
+        text_xp_buffer.discard(guild_id, user_id)
     last_activity = int(time.time())
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         await cursor.execute(f"INSERT OR IGNORE INTO users_xp_data (guild_id, user_id, voice_xp, text_xp) VALUES(?,?,?,?)", (guild_id, user_id, 0, 0))
         if voice_xp is not None:
             await cursor.execute(f"UPDATE users_xp_data SET voice_xp = ?, last_activity = ? WHERE guild_id = ? AND user_id = ?", (voice_xp, last_activity, guild_id, user_id,))
         if text_xp is not None:
             await cursor.execute(f"UPDATE users_xp_data SET text_xp = ?, last_activity = ? WHERE guild_id = ? AND user_id = ?", (text_xp, last_activity, guild_id, user_id,))
-        await db.commit()
+
+async def add_voice_xp(members: list) -> dict:
+    ans = {}
+    if not members:
+        return ans
+
+    last_activity = int(time.time())
+    chunk_size = 200
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
+        for start in range(0, len(members), chunk_size):
+            chunk = members[start:start + chunk_size]
+            values = ", ".join(["(?, ?, 1, 0, ?)"] * len(chunk))
+            params = []
+            for guild_id, user_id in chunk:
+                params.extend((guild_id, user_id, last_activity))
+            await cursor.execute(f"""INSERT INTO users_xp_data (guild_id, user_id, voice_xp, text_xp, last_activity) VALUES {values}
+                                     ON CONFLICT(guild_id, user_id) DO UPDATE SET voice_xp = voice_xp + 1, last_activity = excluded.last_activity
+                                     RETURNING guild_id, user_id, voice_xp""", params)
+            for row in await cursor.fetchall():
+                ans[(row["guild_id"], row["user_id"])] = row["voice_xp"]
+    return ans
+
 
 async def get_activity_info():
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.read() as db, db.cursor() as cursor:
         await cursor.execute(f"SELECT guild_id, user_id, last_activity FROM users_xp_data")
         res = await cursor.fetchall()
         return res
 
 
 async def reset_xp(guild_id: int) -> None:
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    text_xp_buffer.discard(guild_id)
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         await cursor.execute(f"DELETE FROM users_xp_data WHERE guild_id = ?", (guild_id,))
-        await db.commit()
 
 
 async def reset_ranks(guild_id: int) -> None:
-    await ensure_tables()
-    async with aiosqlite.connect('db/bot_database.db', timeout=1000) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.cursor()
+    async with connection_manager.bot_db.write() as db, db.cursor() as cursor:
         await cursor.execute(f"DELETE FROM ranks_data WHERE guild_id = ?", (guild_id,))
-        await db.commit()
+    guild_options.set(guild_id, GuildOption.RANK_LIST, [])
 
 
 async def add_user_xp(guild_id: int, user_id: int, voice_xp: int | None = None, text_xp: int | None = None) -> None:
     if not guild_id or not user_id or (not voice_xp and not text_xp):
         return None
 
-    v_xp, t_xp = await get_user_xp(guild_id, user_id)
-    if voice_xp:
-        v_xp += voice_xp
     if text_xp:
-        t_xp += text_xp
-    await set_user_xp(guild_id, user_id, v_xp, t_xp)
+        text_xp_buffer.add(guild_id, user_id, text_xp)
+    if voice_xp:
+        v_xp, _ = await get_user_xp(guild_id, user_id)
+        await set_user_xp(guild_id, user_id, voice_xp=v_xp + voice_xp)
 
 
 def sort_ranks(ranks: list, reverse: bool = False) -> list:
@@ -672,8 +789,7 @@ async def dm_user(message: str, user_id: int, bot, embed=None, components=None,
 
 
 async def add_playlist_delayed_task(function, await_flag: bool, playlist_future: asyncio.Future, *args, **kwargs) -> None:
-    while not playlist_future.done():
-        await asyncio.sleep(1)
+    await playlist_future
     if await_flag:
         await function(*args, **kwargs)
     else:
@@ -697,22 +813,10 @@ def rgb_to_hex(r: int, g: int, b: int) -> str:
     return (f"#{hex(r)[2:]:0>2}{hex(g)[2:]:0>2}{hex(b)[2:]:0>2}").upper()
 
 
-def get_queue_duration(queue: list) -> None | str:
+def get_queue_duration(queue) -> None | str:
     ans = ""
-    duration = 0
-    live_tracks = 0
-
-    for song in queue:
-        if not song.track_info.done():
-            continue
-        info = song.track_info.result()
-        if (isinstance(info, str)):
-            live_tracks += 1
-        else:
-            if "live_status" in info and info['live_status'] == "is_live" or info['duration'] == 0:
-                live_tracks += 1
-            else:
-                duration += info['duration']
+    duration = queue.duration
+    live_tracks = queue.live_tracks
 
     if duration > 0:
         duration = {'duration': duration}
@@ -0,0 +1,284 @@
+import os
+import gzip
+import shutil
+import asyncio
+import datetime
+
+import configs.public_config as public_config
+
+import helpers.connection_manager as connection_manager
+
+
+# columns of every log table, each table is split into monthly partitions named <table>_<YYYY>_<MM>
+log_tables = {
+    "common": ["guild_id INTEGER", "date TEXT", "time TEXT", "tag TEXT", "comment TEXT"],
+    "status": ["date TEXT", "time TEXT", "user_id INTEGER", "comment TEXT"],
+    "bots": ["date TEXT", "time TEXT", "tag TEXT", "comment TEXT"],
+    "gpt": ["date TEXT", "time TEXT", "user_id INTEGER", "query TEXT", "response TEXT"],
+}
+
+# tables with a full-text index over comment, the column is used in the (column, date, time) index
+searchable_tables = {
+    "common": "guild_id",
+    "status": "user_id",
+}
+
+known_partitions = set()
+
+
+def get_month(date: str) -> str:
+    return date[:7].replace("-", "_")
+
+
+def partition_name(table_name: str, month: str) -> str:
+    return f"{table_name}_{month}"
+
+
+def get_placeholders(table_name: str) -> str:
+    return ", ".join(["?"] * len(log_tables[table_name]))
+
+
+def get_match_query(*texts) -> str:
+    words = []
+    for text in texts:
+        if text:
+            words += text.split()
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def months_passed(month: str, now: datetime.datetime) -> int:
+    year, month_number = month.split("_")
+    return (now.year - int(year)) * 12 + now.month - int(month_number)
+
+
+async def ensure_partition(db, table_name: str, month: str) -> str:
+    name = partition_name(table_name, month)
+    if name not in known_partitions:
+        await db.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(log_tables[table_name])})")
+        if table_name in searchable_tables:
+            await create_search_index(db, table_name, name)
+        known_partitions.add(name)
+    return name
+
+
+async def create_search_index(db, table_name: str, name: str) -> None:
+    column = searchable_tables[table_name]
+    await db.execute(f"CREATE INDEX IF NOT EXISTS {name}_{column}_date ON {name} ({column}, date, time)")
+    await db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(comment, content='{name}', content_rowid='rowid')")
+    await db.execute(f"""CREATE TRIGGER IF NOT EXISTS {name}_fts_insert AFTER INSERT ON {name} BEGIN
+                            INSERT INTO {name}_fts (rowid, comment) VALUES (new.rowid, new.comment);
+                         END""")
+
+
+async def rebuild_search_indexes(db) -> None:
+    for table_name in searchable_tables:
+        for month in await get_partitions(db, table_name):
+            name = partition_name(table_name, month)
+            await create_search_index(db, table_name, name)
+            await db.execute(f"INSERT INTO {name}_fts ({name}_fts) VALUES ('rebuild')")
+
+
+async def get_partitions(db, table_name: str) -> list:
+    async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?", (f"{table_name}_[0-9][0-9][0-9][0-9]_[0-9][0-9]",)) as cursor:
+        rows = await cursor.fetchall()
+    return sorted(row[0][len(table_name) + 1:] for row in rows)
+
+
+def compress_file(path: str) -> str:
+    with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+    return f"{path}.gz"
+
+
+class LogArchiver():
+    archived = None
+    vacuumed_pages = None
+
+    def __init__(self):
+        self.archived = 0
+        self.vacuumed_pages = 0
+
+    async def enable_incremental_vacuum(self) -> None:
+        async with connection_manager.logs_db.write() as db:
+            async with db.execute("PRAGMA auto_vacuum") as cursor:
+                mode = (await cursor.fetchone())[0]
+            if mode != 2:
+                await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await db.execute("VACUUM")
+                # VACUUM may renumber rowids, full-text indexes refer to them
+                await rebuild_search_indexes(db)
+
+    async def archive_partition(self, name: str) -> None:
+        folder = public_config.logs_settings["ArchiveFolder"]
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        path = os.path.join(folder, f"{name}.db")
+        if os.path.exists(path):
+            os.remove(path)
+
+        async with connection_manager.logs_db.write() as db:
+            await db.execute("ATTACH DATABASE ? AS archive", (path,))
+            try:
+                await db.execute(f"CREATE TABLE archive.{name} AS SELECT * FROM main.{name}")
+                await db.commit()
+            finally:
+                await db.execute("DETACH DATABASE archive")
+        await asyncio.to_thread(compress_file, path)
+
+        async with connection_manager.logs_db.write() as db:
+            await db.execute(f"DROP TABLE IF EXISTS {name}_fts")
+            await db.execute(f"DROP TABLE {name}")
+        known_partitions.discard(name)
+        self.archived += 1
+
+    async def archive_expired(self) -> None:
+        now = datetime.datetime.now()
+        expired = []
+        async with connection_manager.logs_db.read() as db:
+            for table_name, retention in public_config.logs_settings["RetentionMonths"].items():
+                for month in await get_partitions(db, table_name):
+                    if months_passed(month, now) > retention:
+                        expired.append(partition_name(table_name, month))
+        for name in expired:
+            try:
+                await self.archive_partition(name)
+            except Exception as err:
+                print(f"Caught exception while archiving {name}: {err}")
+
+    async def vacuum(self) -> None:
+        while True:
+            async with connection_manager.logs_db.write() as db:
+                # without incremental auto_vacuum the pragma frees nothing
+                async with db.execute("PRAGMA auto_vacuum") as cursor:
+                    if (await cursor.fetchone())[0] != 2:
+                        return
+                async with db.execute("PRAGMA freelist_count") as cursor:
+                    free_pages = (await cursor.fetchone())[0]
+                if not free_pages:
+                    return
+                pages = min(free_pages, public_config.logs_settings["VacuumPages"])
+                await db.executescript(f"PRAGMA incremental_vacuum({pages});")
+                async with db.execute("PRAGMA freelist_count") as cursor:
+                    left_pages = (await cursor.fetchone())[0]
+            self.vacuumed_pages += free_pages - left_pages
+            # nothing was freed, do not hold the writer lock in a loop
+            if left_pages >= free_pages:
+                return
+            await asyncio.sleep(0)
+
+    async def run(self) -> None:
+        try:
+            await self.enable_incremental_vacuum()
+        except Exception as err:
+            print(f"Caught exception while enabling incremental vacuum: {err}")
+        while True:
+            await self.archive_expired()
+            try:
+                await self.vacuum()
+            except Exception as err:
+                print(f"Caught exception in logs vacuum: {err}")
+            await asyncio.sleep(public_config.logs_settings["MaintenanceInterval"])
+
+    def stats(self) -> str:
+        return f"log archiver: {self.archived} partitions archived, {self.vacuumed_pages} pages vacuumed"
+
+
+log_archiver = LogArchiver()
+
+
+class LogSearch():
+    guild_id = None
+    tag = None
+    user_id = None
+    user_name = None
+    date_from = None
+    date_to = None
+    text = None
+    months = None
+    common_months = None
+    status_months = None
+
+    def __init__(self, guild_id: int, tag: str = None, user_id: int = None, user_name: str = None, date_from: str = None, date_to: str = None, text: str = None):
+        self.guild_id = guild_id
+        self.tag = tag
+        self.user_id = user_id
+        self.user_name = user_name
+        self.date_from = date_from
+        self.date_to = date_to
+        self.text = text
+
+    def in_range(self, month: str) -> bool:
+        if self.date_from and month < get_month(self.date_from):
+            return False
+        if self.date_to and month > get_month(self.date_to):
+            return False
+        return True
+
+    async def load_months(self) -> None:
+        async with connection_manager.logs_db.read() as db:
+            self.common_months = set(month for month in await get_partitions(db, "common") if self.in_range(month))
+            self.status_months = set()
+            if self.user_id:
+                self.status_months = set(month for month in await get_partitions(db, "status") if self.in_range(month))
+        self.months = sorted(self.common_months | self.status_months, reverse=True)
+
+    def build_query(self, month: str) -> (str, list):
+        dates = ""
+        date_params = []
+        if self.date_from:
+            dates += " AND date >= ?"
+            date_params.append(self.date_from)
+        if self.date_to:
+            dates += " AND date <= ?"
+            date_params.append(self.date_to)
+
+        queries = []
+        params = []
+        if self.tag != "STATUS" and month in self.common_months:
+            name = partition_name("common", month)
+            query = f"SELECT date, time, tag, comment FROM {name} WHERE guild_id = ?{dates}"
+            params += [self.guild_id] + date_params
+            if self.tag:
+                query += " AND tag = ?"
+                params.append(self.tag)
+            match = get_match_query(self.text, self.user_name)
+            if match:
+                query += f" AND rowid IN (SELECT rowid FROM {name}_fts WHERE {name}_fts MATCH ?)"
+                params.append(match)
+            queries.append(query)
+        if self.tag in (None, "STATUS") and month in self.status_months:
+            name = partition_name("status", month)
+            query = f"SELECT date, time, 'STATUS' AS tag, comment FROM {name} WHERE user_id = ?{dates}"
+            params += [self.user_id] + date_params
+            match = get_match_query(self.text)
+            if match:
+                query += f" AND rowid IN (SELECT rowid FROM {name}_fts WHERE {name}_fts MATCH ?)"
+                params.append(match)
+            queries.append(query)
+        if not queries:
+            return None, None
+        return " UNION ALL ".join(queries) + " ORDER BY date DESC, time DESC LIMIT ? OFFSET ?", params
+
+    async def fetch(self, position: tuple, amount: int) -> (list, tuple):
+        if self.months is None:
+            await self.load_months()
+        month_index, offset = position
+        rows = []
+        async with connection_manager.logs_db.read() as db:
+            while month_index < len(self.months) and len(rows) < amount:
+                query, params = self.build_query(self.months[month_index])
+                found = []
+                if query:
+                    required = amount - len(rows)
+                    async with db.execute(query, params + [required + 1, offset]) as cursor:
+                        found = await cursor.fetchall()
+                    if len(found) > required:
+                        rows += found[:required]
+                        return rows, (month_index, offset + required)
+                rows += found
+                month_index += 1
+                offset = 0
+        if month_index < len(self.months):
+            return rows, (month_index, offset)
+        return rows, None
@@ -0,0 +1,188 @@
+import os
+import ast
+import aiosqlite
+
+import configs.public_config as public_config
+
+import helpers.log_partitions as log_partitions
+
+
+# ---------------- BOT DATABASE ----------------------------------------------------------------
+
+
+async def bot_database_v1(db) -> None:
+    await db.execute('''CREATE TABLE IF NOT EXISTS users_xp_data (
+                        guild_id INTEGER,
+                        user_id INTEGER,
+                        voice_xp INTEGER,
+                        text_xp INTEGER,
+                        last_activity INTEGER,
+                        UNIQUE(guild_id, user_id)
+                    )''')
+
+    await db.execute('''CREATE TABLE IF NOT EXISTS ranks_data (
+                        guild_id INTEGER,
+                        rank_id INTEGER,
+                        voice_xp INTEGER,
+                        remove_flag INTEGER,
+                        UNIQUE(guild_id, rank_id)
+                    )''')
+
+    await db.execute('''CREATE TABLE IF NOT EXISTS server_options (
+                        guild_id INTEGER PRIMARY KEY,
+                        log_channel INTEGER,
+                        status_log_channel INTEGER,
+                        welcome_channel INTEGER,
+                        private_category INTEGER,
+                        private_channel INTEGER,
+                        admin_list TEXT,
+                        untouchables_list TEXT,
+                        giveaway_message INTEGER,
+                        giveaway_role INTEGER
+                    )''')
+
+
+async def bot_database_v2(db) -> None:
+    await db.execute("CREATE INDEX IF NOT EXISTS users_xp_voice_top ON users_xp_data (guild_id, voice_xp DESC, user_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS users_xp_text_top ON users_xp_data (guild_id, text_xp DESC, user_id)")
+
+
+async def bot_database_v3(db) -> None:
+    for table, column in [("guild_admins", "admin_list"), ("guild_untouchables", "untouchables_list")]:
+        await db.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                            guild_id INTEGER,
+                            user_id INTEGER,
+                            UNIQUE(guild_id, user_id)
+                        )''')
+        rows = []
+        async with db.execute(f"SELECT guild_id, {column} FROM server_options WHERE {column} IS NOT NULL") as cursor:
+            for guild_id, value in await cursor.fetchall():
+                rows += [(guild_id, int(user_id)) for user_id in ast.literal_eval(value) or []]
+        await db.executemany(f"INSERT OR IGNORE INTO {table} (guild_id, user_id) VALUES(?, ?)", rows)
+        await db.execute(f"ALTER TABLE server_options DROP COLUMN {column}")
+
+
+async def bot_database_v4(db) -> None:
+    await db.execute("CREATE TABLE IF NOT EXISTS text_xp_flushes (last_batch INTEGER)")
+    await db.execute("INSERT INTO text_xp_flushes VALUES(0)")
+
+
+# ---------------- LOGS DATABASE ----------------------------------------------------------------
+
+
+async def logs_v1(db) -> None:
+    await db.execute('''CREATE TABLE IF NOT EXISTS status (
+                        date TEXT,
+                        time TEXT,
+                        user_id INTEGER,
+                        comment TEXT
+                    )''')
+
+    await db.execute('''CREATE TABLE IF NOT EXISTS gpt (
+                        date TEXT,
+                        time TEXT,
+                        user_id INTEGER,
+                        query TEXT,
+                        response TEXT
+                    )''')
+
+    await db.execute('''CREATE TABLE IF NOT EXISTS bots (
+                        date TEXT,
+                        time TEXT,
+                        tag TEXT,
+                        comment TEXT
+                    )''')
+
+    await db.execute('''CREATE TABLE IF NOT EXISTS common (
+                        guild_id INTEGER,
+                        date TEXT,
+                        time TEXT,
+                        tag TEXT,
+                        comment TEXT
+                    )''')
+
+
+async def logs_v2(db) -> None:
+    for table_name in log_partitions.log_tables:
+        async with db.execute(f"SELECT DISTINCT substr(date, 1, 7) FROM {table_name} WHERE date IS NOT NULL") as cursor:
+            months = [log_partitions.get_month(row[0]) for row in await cursor.fetchall()]
+        for month in months:
+            name = await log_partitions.ensure_partition(db, table_name, month)
+            await db.execute(f"INSERT INTO {name} SELECT * FROM {table_name} WHERE substr(date, 1, 7) = ?", (month.replace("_", "-"),))
+        await db.execute(f"DROP TABLE {table_name}")
+
+
+async def logs_v3(db) -> None:
+    await log_partitions.rebuild_search_indexes(db)
+
+
+# ---------------- MUSIC CACHE DATABASE ----------------------------------------------------------------
+
+
+async def music_cache_v1(db) -> None:
+    await db.execute('''CREATE TABLE IF NOT EXISTS tracks (
+                        video_id TEXT PRIMARY KEY,
+                        info TEXT,
+                        stream_url TEXT,
+                        expire INTEGER,
+                        updated INTEGER
+                    )''')
+    await db.execute("CREATE INDEX IF NOT EXISTS tracks_updated ON tracks (updated)")
+
+
+# migration steps are applied in order, position in the list + 1 is the schema version
+bot_database_migrations = [
+    bot_database_v1,
+    bot_database_v2,
+    bot_database_v3,
+    bot_database_v4,
+]
+
+logs_migrations = [
+    logs_v1,
+    logs_v2,
+    logs_v3,
+]
+
+music_cache_migrations = [
+    music_cache_v1,
+]
+
+# ---------------- HELPING METHODS  ----------------------------------------------------------------
+
+
+async def get_version(db) -> int:
+    await db.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER)")
+    async with db.execute("SELECT version FROM schema_version") as cursor:
+        row = await cursor.fetchone()
+    if not row:
+        await db.execute("INSERT INTO schema_version VALUES(0)")
+        await db.commit()
+        return 0
+    return row[0]
+
+
+async def migrate(path: str, migrations: list) -> int:
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    async with aiosqlite.connect(path, timeout=public_config.database_settings["Timeout"]) as db:
+        version = await get_version(db)
+        for step in migrations[version:]:
+            await db.execute("BEGIN")
+            try:
+                await step(db)
+                version += 1
+                await db.execute("UPDATE schema_version SET version = ?", (version,))
+                await db.commit()
+            except:
+                await db.rollback()
+                raise
+    return version
+
+
+async def migrate_all() -> None:
+    await migrate('db/bot_database.db', bot_database_migrations)
+    await migrate('db/logs.db', logs_migrations)
+    if public_config.music_cache_settings["Persist"]:
+        await migrate('db/music_cache.db', music_cache_migrations)
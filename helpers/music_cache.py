@@ -0,0 +1,212 @@
+import re
+import time
+import json
+import asyncio
+from collections import OrderedDict
+
+import configs.public_config as public_config
+
+import helpers.connection_manager as connection_manager
+
+
+video_id_pattern = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|live/|embed/)|youtu\.be/)([A-Za-z0-9_-]{11})")
+expire_pattern = re.compile(r"[?&/]expire[=/](\d+)")
+punctuation_pattern = re.compile(r"[^\w\s]")
+
+
+def get_video_id(url: str) -> str | None:
+    if not url:
+        return None
+    match = video_id_pattern.search(url)
+    if not match:
+        return None
+    return match.group(1)
+
+
+def get_expire(stream_url: str) -> int:
+    match = expire_pattern.search(stream_url)
+    if match:
+        return int(match.group(1))
+    return int(time.time()) + public_config.music_cache_settings["StreamTTL"]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(punctuation_pattern.sub(" ", query.lower()).split())
+
+
+def stamp_expire(info: dict) -> dict:
+    # urls without "expire" get a ttl counted from extraction, not from every later check
+    if isinstance(info, dict) and info.get("url") and "entries" not in info:
+        info["expire"] = get_expire(info["url"])
+        info["lifetime"] = info["expire"] - int(time.time())
+    return info
+
+
+def expires_in(info: dict) -> float:
+    return (info.get("expire") or get_expire(info["url"])) - time.time()
+
+
+def validity_needed(duration: float, lifetime: float, starts_in: float = 0) -> float:
+    margin = public_config.music_cache_settings["ExpireMargin"]
+    if duration + margin > lifetime:
+        # no stream url outlives this track, it only has to be valid when playback starts
+        return starts_in + margin
+    return starts_in + duration + margin
+
+
+def needs_refresh(info, starts_in: float = 0) -> bool:
+    if not isinstance(info, dict) or not info.get("url") or info.get("live_status") == "is_live" or not info.get("duration"):
+        return False
+    lifetime = info.get("lifetime") or public_config.music_cache_settings["StreamTTL"]
+    needed = validity_needed(info["duration"], lifetime, starts_in)
+    # a fresh url would not last until then either, refresh when the song gets closer
+    if needed > lifetime:
+        return False
+    return expires_in(info) < needed
+
+
+class TrackCache():
+    tracks = None
+    streams = None
+    bytes_used = None
+    hits = None
+    misses = None
+    expired = None
+    db = None
+
+    def __init__(self, db=None):
+        self.tracks = OrderedDict()
+        self.streams = {}
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.db = db
+
+    def is_fresh(self, video_id: str) -> bool:
+        if video_id not in self.streams:
+            return False
+        _, expire = self.streams[video_id]
+        duration = self.tracks[video_id][0].get("duration") or 0
+        return expire - time.time() > validity_needed(duration, public_config.music_cache_settings["StreamTTL"])
+
+    def get(self, url: str) -> dict | None:
+        video_id = get_video_id(url)
+        if not video_id or video_id not in self.tracks:
+            self.misses += 1
+            return None
+        if not self.is_fresh(video_id):
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.tracks.move_to_end(video_id)
+        self.hits += 1
+        info = dict(self.tracks[video_id][0])
+        info["url"], info["expire"] = self.streams[video_id]
+        return info
+
+    def store(self, video_id: str, info: dict, stream_url: str, expire: int) -> None:
+        self.remove(video_id)
+        size = len(json.dumps(info)) + len(stream_url)
+        self.tracks[video_id] = [info, size]
+        self.streams[video_id] = (stream_url, expire)
+        self.bytes_used += size
+        while self.bytes_used > public_config.music_cache_settings["MaxBytes"] and len(self.tracks) > 1:
+            self.remove(next(iter(self.tracks)))
+
+    def remove(self, video_id: str) -> None:
+        if video_id in self.tracks:
+            self.bytes_used -= self.tracks.pop(video_id)[1]
+            self.streams.pop(video_id, None)
+
+    async def put(self, url: str, info: dict) -> None:
+        video_id = get_video_id(url) or get_video_id(info.get("webpage_url"))
+        if not video_id or "entries" in info or not info.get("url") or info.get("live_status") == "is_live":
+            return
+        slim_info = {key: info.get(key) for key in public_config.track_info_keys if key != "url"}
+        expire = info.get("expire") or get_expire(info["url"])
+        self.store(video_id, slim_info, info["url"], expire)
+        if not self.db:
+            return
+        try:
+            async with self.db.write() as db:
+                await db.execute("""INSERT INTO tracks (video_id, info, stream_url, expire, updated) VALUES(?, ?, ?, ?, ?)
+                                    ON CONFLICT(video_id) DO UPDATE SET info = excluded.info, stream_url = excluded.stream_url, expire = excluded.expire, updated = excluded.updated""",
+                                 (video_id, json.dumps(slim_info), info["url"], expire, int(time.time())))
+        except Exception as err:
+            print(f"Caught exception while saving track cache: {err}")
+
+    async def load(self) -> None:
+        if not self.db:
+            return
+        async with self.db.write() as db:
+            await db.execute("DELETE FROM tracks WHERE video_id NOT IN (SELECT video_id FROM tracks ORDER BY updated DESC LIMIT ?)",
+                             (public_config.music_cache_settings["MaxPersisted"],))
+        async with self.db.read() as db, db.execute("SELECT video_id, info, stream_url, expire FROM tracks ORDER BY updated") as cursor:
+            rows = await cursor.fetchall()
+        for row in rows:
+            self.store(row["video_id"], json.loads(row["info"]), row["stream_url"], row["expire"])
+
+    def stats(self) -> str:
+        requests = self.hits + self.misses
+        ratio = round(self.hits / requests * 100, 1) if requests else 0
+        ans = f"track cache: {len(self.tracks)} tracks, {round(self.bytes_used / 1024, 1)} KiB used, "
+        ans += f"{self.hits} hits, {self.misses} misses ({self.expired} expired streams), hit ratio {ratio}%"
+        return ans
+
+
+class SearchCache():
+    results = None
+    in_flight = None
+    hits = None
+    misses = None
+    shared = None
+
+    def __init__(self):
+        self.results = OrderedDict()
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    async def search(self, query: str, fetch):
+        key = normalize_query(query)
+        if key in self.results:
+            songs, created = self.results[key]
+            if time.time() - created < public_config.music_cache_settings["SearchTTL"]:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return songs
+            del self.results[key]
+        if key in self.in_flight:
+            self.shared += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            songs = await fetch(query)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # nobody may wait for this future, mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+        future.set_result(songs)
+        if songs:
+            self.results[key] = (songs, time.time())
+            while len(self.results) > public_config.music_cache_settings["MaxSearches"]:
+                self.results.popitem(last=False)
+        return songs
+
+    def stats(self) -> str:
+        return f"search cache: {len(self.results)} queries, {self.hits} hits, {self.misses} misses, {self.shared} shared in-flight searches"
+
+
+track_cache = TrackCache((None, connection_manager.music_cache_db)[public_config.music_cache_settings["Persist"]])
+search_cache = SearchCache()
@@ -0,0 +1,118 @@
+import re
+import json
+import asyncio
+import aiohttp
+
+import configs.public_config as public_config
+
+
+def parse_widget(body: bytes) -> dict:
+    data = json.loads(body)
+    data["duration"] -= 14
+    data["name"] = re.search("151; (.+?)</span>", data['on_air']).group(1)
+    data["source"] = re.search("blank'>(.+?)</a>", data['on_air']).group(1)
+    return data
+
+
+class RadioPoller():
+    url = None
+    subscribers = None
+    task = None
+    data = None
+    body = None
+    etag = None
+    last_modified = None
+    delay = None
+    notify_tasks = None
+    requests = None
+    not_modified = None
+    failures = None
+
+    def __init__(self, url: str):
+        self.url = url
+        self.subscribers = {}
+        self.notify_tasks = set()
+        self.delay = public_config.radio_settings["PollInterval"]
+        self.requests = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    def subscribe(self, key, callback) -> None:
+        self.subscribers[key] = callback
+        if self.data:
+            self.notify(callback, self.data)
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+    def unsubscribe(self, key) -> None:
+        self.subscribers.pop(key, None)
+        if not self.subscribers and self.task:
+            self.task.cancel()
+            self.task = None
+
+    def notify(self, callback, data: dict) -> None:
+        # every subscriber gets its own task, a slow text channel does not hold back the others
+        task = asyncio.create_task(callback(dict(data)))
+        self.notify_tasks.add(task)
+        task.add_done_callback(self.notify_tasks.discard)
+
+    async def poll(self, session) -> bool:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        self.requests += 1
+        async with session.get(self.url, headers=headers) as response:
+            if response.status == 304:
+                self.not_modified += 1
+                return False
+            response.raise_for_status()
+            body = await response.read()
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+        if body == self.body:
+            return False
+        data = parse_widget(body)
+        self.body = body
+        if self.data and self.data["name"] == data["name"]:
+            return False
+        self.data = data
+        return True
+
+    async def run(self) -> None:
+        timeout = aiohttp.ClientTimeout(total=public_config.radio_settings["Timeout"])
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while True:
+                try:
+                    if await self.poll(session):
+                        for callback in list(self.subscribers.values()):
+                            self.notify(callback, self.data)
+                    self.delay = public_config.radio_settings["PollInterval"]
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    self.failures += 1
+                    self.delay = min(self.delay * 2, public_config.radio_settings["MaxBackoff"])
+                    print(f"Caught exception while polling {self.url}: {err}")
+                await asyncio.sleep(self.delay)
+
+    def stats(self) -> str:
+        return f"{self.url}: {len(self.subscribers)} subscribers, {self.requests} requests, {self.not_modified} not modified, {self.failures} failed"
+
+
+pollers = {}
+
+
+def subscribe(url: str, key, callback) -> None:
+    if url not in pollers:
+        pollers[url] = RadioPoller(url)
+    pollers[url].subscribe(key, callback)
+
+
+def unsubscribe(url: str, key) -> None:
+    if url not in pollers:
+        return
+    pollers[url].unsubscribe(key)
+    if not pollers[url].subscribers:
+        del pollers[url]
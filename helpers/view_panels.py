@@ -1,6 +1,5 @@
 import disnake
 import asyncio
-import random
 from disnake import TextInputStyle
 
 import configs.private_config as private_config
@@ -20,6 +19,8 @@ class SongSelection(disnake.ui.View):
     inter = None
     bot = None
     value = None
+    prefetch_tasks = None
+    started = None
 
     def __init__(self, songs, func, inter, song, bot):
         self.author = inter.author
@@ -30,6 +31,8 @@ class SongSelection(disnake.ui.View):
         self.inter = inter
         self.bot = bot
         self.value = False
+        self.prefetch_tasks = {}
+        self.started = set()
         for song in songs:
             url = f"https://www.youtube.com/{song['url_suffix'][:song['url_suffix'].find('&')]}"
             self.url_list.append(url)
@@ -39,8 +42,14 @@ class SongSelection(disnake.ui.View):
     async def button_callback(self, button_num, inter):
         if inter.author == self.author or await helpers.is_admin(inter.author):
             await helpers.try_function(self.message.delete, True)
-            await self.func(self.inter, self.song, self.url_list[button_num], respond=False)
+            url = self.url_list[button_num]
+            prefetched = self.prefetch_tasks.pop(url, None)
+            if prefetched and url not in self.started:
+                prefetched.cancel()
+                prefetched = None
+            self.cancel_prefetch()
             self.value = True
+            await self.func(self.inter, self.song, url, respond=False, prefetched=prefetched)
         else:
             await helpers.try_function(inter.author.send, True, f"Don't you even try to use someone's selection panel once again. {public_config.emojis['dead']}")
 
@@ -68,18 +77,26 @@ class SongSelection(disnake.ui.View):
     async def cancel_selection(self, button: disnake.ui.Button, inter: disnake.AppCmdInter):
         if self.value:
             return
+        self.cancel_prefetch()
         try:
             await helpers.try_function(self.message.delete, True)
             voice = self.bot.states[self.inter.guild.id].voice
             self.value = True
             self.song.track_info.set_result(None)
-            await helpers.try_function(self.bot.states[self.inter.guild.id].song_queue.remove, False, self.song)
+            await helpers.try_function(self.bot.states[self.inter.guild.id].remove_song, False, self.song)
             if not (voice.is_playing() or voice.is_paused()):
                 await self.bot.abort_play(self.inter.guild.id, message=None)
         except Exception as err:
             print(f"Caught exception in select: {err}")
             pass
 
+    def cancel_prefetch(self):
+        # extractions which already started are finished into the track cache
+        for url, task in self.prefetch_tasks.items():
+            if url not in self.started:
+                task.cancel()
+        self.prefetch_tasks.clear()
+
     async def send(self):
         embed = embedder.song_selections(self.author, self.songs_list)
         _, self.message = await helpers.try_function(self.inter.text_channel.send, True, view=self, embed=embed)
@@ -87,12 +104,13 @@ class SongSelection(disnake.ui.View):
     async def on_timeout(self):
         if self.value:
             return
+        self.cancel_prefetch()
         try:
             await helpers.try_function(self.message.delete, True)
             voice = self.bot.states[self.inter.guild.id].voice
             self.value = True
             self.song.track_info.set_result(None)
-            await helpers.try_function(self.bot.states[self.inter.guild.id].song_queue.remove, False, self.song)
+            await helpers.try_function(self.bot.states[self.inter.guild.id].remove_song, False, self.song)
             _, self.message = await helpers.try_function(self.inter.text_channel.send, True, f"{self.inter.author.mention} You're out of time! Next time think faster!", delete_after=5)
             if not (voice.is_playing() or voice.is_paused()):
                 await self.bot.abort_play(self.inter.guild.id, message=None)
@@ -108,6 +126,7 @@ class QueueList(disnake.ui.View):
     queue = None
     bot = None
     message = None
+    rendered = None
 
     def __init__(self, queue, inter, song, bot):
         self.queue = queue
@@ -162,10 +181,12 @@ class QueueList(disnake.ui.View):
         if not self.bot.states[inter.guild.id].current_song:
             await inter.response.defer()
             return
-        random.shuffle(self.queue)
+        self.bot.states[inter.guild.id].shuffle()
+        self.bot.prefetch(self.bot.states[inter.guild.id])
         await self.button_callback(0, inter)
 
     async def send(self, embed=None):
+        self.rendered = (self.queue.version, self.start_index, id(self.song))
         _, self.message = await helpers.try_function(self.inter.text_channel.send, True, view=self, embed=embed)
 
     async def button_callback(self, button_value, inter):
@@ -176,6 +197,11 @@ class QueueList(disnake.ui.View):
 
         if self.start_index + button_value >= 0 and self.start_index + button_value <= len(self.queue):
             self.start_index += button_value
+        # the queue version changes on every add, removal, resolution and shuffle
+        rendered = (self.queue.version, self.start_index, id(self.song))
+        if rendered == self.rendered:
+            return
+        self.rendered = rendered
         self.update_buttons()
         embed = embedder.queue(self.inter.guild, self.queue, self.start_index, self.song)
         await helpers.try_function(self.message.edit, True, view=self, embed=embed)
@@ -191,17 +217,21 @@ class QueueList(disnake.ui.View):
 class TopXP(disnake.ui.View):
     inter = None
     author_info = None
+    author_position = None
     start_index = None
     top_users = None
+    total = None
     bot = None
     message = None
     type_voice = None
 
-    def __init__(self, top_users, inter, author_info, bot, xp_type_voice):
+    def __init__(self, top_users, total, inter, author_info, author_position, bot, xp_type_voice):
         self.top_users = top_users
+        self.total = total
         self.bot = bot
         self.inter = inter
         self.author_info = author_info
+        self.author_position = author_position
         self.start_index = 0
         self.type_voice = xp_type_voice
 
@@ -229,12 +259,14 @@ class TopXP(disnake.ui.View):
 
         v_xp, t_xp = await helpers.get_user_xp(inter.guild.id, inter.author.id)
         self.author_info = [inter.author.id, v_xp, t_xp]
-        self.top_users = await helpers.get_guild_top(inter.guild.id, self.type_voice)
+        self.author_position = await helpers.get_user_top_position(inter.guild.id, inter.author.id, self.type_voice)
+        self.total = await helpers.get_guild_top_count(inter.guild.id, self.type_voice)
 
-        if self.start_index + button_value >= 0 and self.start_index + button_value <= len(self.top_users):
+        if self.start_index + button_value >= 0 and self.start_index + button_value <= self.total:
             self.start_index += button_value
+            self.top_users = await helpers.get_guild_top(inter.guild.id, self.type_voice, self.start_index)
             self.update_buttons()
-            embed = embedder.xp_top(self.inter.guild, self.top_users, self.start_index, self.author_info, self.bot.get_user, self.type_voice)
+            embed = embedder.xp_top(self.inter.guild, self.top_users, self.start_index, self.author_info, self.author_position, self.bot.get_user, self.type_voice)
             await helpers.try_function(self.message.edit, True, view=self, embed=embed)
 
     def update_buttons(self):
@@ -242,7 +274,66 @@ class TopXP(disnake.ui.View):
             if isinstance(child, disnake.ui.Button) and child.custom_id and child.custom_id == "prev":
                 child.disabled = (self.start_index == 0)
             if isinstance(child, disnake.ui.Button) and child.custom_id and child.custom_id == "next":
-                child.disabled = (self.start_index + 10 > len(self.top_users))
+                child.disabled = (self.start_index + 10 >= self.total)
+
+
+class LogsSearch(disnake.ui.View):
+    inter = None
+    log_search = None
+    positions = None
+    next_position = None
+    rows = None
+    message = None
+
+    def __init__(self, log_search, inter):
+        self.log_search = log_search
+        self.inter = inter
+        self.positions = [(0, 0)]
+        self.rows = []
+
+        super().__init__(timeout=None)
+
+    @disnake.ui.button(label="<", style=disnake.ButtonStyle.secondary, custom_id="prev", disabled=True)
+    async def prev_page(self, button: disnake.ui.Button, inter: disnake.AppCmdInter):
+        await self.button_callback(-1, inter)
+
+    @disnake.ui.button(label=">", style=disnake.ButtonStyle.secondary, custom_id="next", disabled=True)
+    async def next_page(self, button: disnake.ui.Button, inter: disnake.AppCmdInter):
+        await self.button_callback(1, inter)
+
+    async def send(self):
+        await self.load_page()
+        embed = embedder.logs_search(self.inter.guild, self.rows, self.start_index())
+        _, self.message = await helpers.try_function(self.inter.channel.send, True, view=self, embed=embed)
+
+    def start_index(self) -> int:
+        return (len(self.positions) - 1) * 10
+
+    async def load_page(self):
+        self.rows, self.next_position = await self.log_search.fetch(self.positions[-1], 10)
+        self.update_buttons()
+
+    async def button_callback(self, direction, inter):
+        await inter.response.defer()
+        if not await helpers.is_admin(inter.author):
+            return
+
+        if direction < 0 and len(self.positions) > 1:
+            self.positions.pop()
+        elif direction > 0 and self.next_position:
+            self.positions.append(self.next_position)
+        else:
+            return
+        await self.load_page()
+        embed = embedder.logs_search(self.inter.guild, self.rows, self.start_index())
+        await helpers.try_function(self.message.edit, True, view=self, embed=embed)
+
+    def update_buttons(self):
+        for child in self.children:
+            if isinstance(child, disnake.ui.Button) and child.custom_id and child.custom_id == "prev":
+                child.disabled = (len(self.positions) == 1)
+            if isinstance(child, disnake.ui.Button) and child.custom_id and child.custom_id == "next":
+                child.disabled = (self.next_position is None)
 
 
 class MessageForm(disnake.ui.Modal):
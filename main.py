@@ -1,17 +1,24 @@
 import asyncio
 import os
-import sys
 import signal
 import functools
-from concurrent.futures import ThreadPoolExecutor
 
 import configs.private_config as private_config
+import configs.public_config as public_config
 
 from bots.music_leader import MusicBotLeader
 from bots.music_instance import MusicBotInstance
 from bots.log_bot import LogBot
 from bots.admin_bot import AdminBot
 
+import helpers.connection_manager as connection_manager
+import helpers.migrations as migrations
+import helpers.helpers as helpers
+import helpers.database_logger as database_logger
+import helpers.log_partitions as log_partitions
+import helpers.music_cache as music_cache
+import helpers.extraction_pool as extraction_pool
+
 
 async def validate_bots(leaders, instances, admins, loggers):
     if len(leaders) + len(instances) + len(admins) + len(loggers) == 0:
@@ -31,21 +38,33 @@ async def validate_bots(leaders, instances, admins, loggers):
     return True
 
 
-def on_sigterm(loop, pool):
+async def shutdown(loop, pool):
+    await helpers.text_xp_buffer.flush()
+    await database_logger.log_writer.flush()
+    await connection_manager.bot_db.close()
+    await connection_manager.logs_db.close()
+    await connection_manager.music_cache_db.close()
     pool.shutdown(wait=True, cancel_futures=False)
     loop.stop()
-    pass
 
 
-def worker_init():
-    f = open(os.devnull, 'w')
-    sys.stdout = f
-    sys.stderr = f
+def on_sigterm(loop, pool):
+    asyncio.create_task(shutdown(loop, pool))
 
 
 async def main():
     os.chdir(os.path.dirname(__file__))
-    pool = ThreadPoolExecutor(initializer=worker_init)
+    await migrations.migrate_all()
+    pool = extraction_pool.ExtractionPool(extraction_pool.create_pool)
+    await connection_manager.bot_db.start()
+    await connection_manager.logs_db.start()
+    if public_config.music_cache_settings["Persist"]:
+        await connection_manager.music_cache_db.start()
+        await music_cache.track_cache.load()
+    await helpers.guild_options.load()
+    asyncio.create_task(helpers.text_xp_buffer.run())
+    asyncio.create_task(database_logger.log_writer.run())
+    asyncio.create_task(log_partitions.log_archiver.run())
 
     try:
         loop = asyncio.get_running_loop()